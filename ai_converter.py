@@ -5,28 +5,419 @@ Supports: Claude (Anthropic), Gemini (Google), OpenAI, and Grok (xAI)
 """
 
 import os
+import copy
 import json
-from typing import Dict, List, Optional, Any
+import shelve
+import asyncio
+import random
+import hashlib
+import threading
+from typing import Dict, List, Optional, Any, Tuple
 from abc import ABC, abstractmethod
+from pathlib import Path
 import time
 from dotenv import load_dotenv
 
+import json_utils
+
 # Load environment variables from .env file
 load_dotenv()
 
 
+class AsyncRateLimiter:
+    """
+    Token-bucket rate limiter for async code.
+
+    Allows up to max_rate acquisitions per time_period seconds, with bursts
+    up to max_rate. Use as ``async with limiter:`` around each request.
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._tokens = max_rate
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1):
+        """Wait until enough capacity is available and consume it."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.max_rate)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._last_refill) * self.max_rate / self.time_period
+                self._tokens = min(self.max_rate, self._tokens + refill)
+                self._last_refill = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) * self.time_period / self.max_rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class RateLimiter:
+    """
+    Blocking token-bucket rate limiter, the synchronous twin of AsyncRateLimiter.
+
+    RateLimiter(1, delay) spaces calls `delay` seconds apart start-to-start, so
+    time spent waiting on a response counts towards the gap.
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._tokens = max_rate
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        """Block until enough capacity is available and consume it."""
+        amount = min(amount, self.max_rate)
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._last_refill) * self.max_rate / self.time_period
+                self._tokens = min(self.max_rate, self._tokens + refill)
+                self._last_refill = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                time.sleep((amount - self._tokens) * self.time_period / self.max_rate)
+
+
+_encoding = None
+
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use (None if tiktoken is unavailable)."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Not installed, or the BPE file can't be fetched; use the estimate
+            _encoding = False
+    return _encoding or None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for budgeting and rate limits (~4 characters per token without tiktoken)."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Trim text to at most max_tokens tokens without cutting a token in half.
+
+    Without tiktoken, cuts at ~4 characters per token and backs off to the
+    last whitespace so words stay whole.
+    """
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars + 1)
+    return text[:cut if cut > 0 else max_chars]
+
+
+class ProviderResponse(str):
+    """
+    Response text from a provider.
+
+    A str, so callers can treat it as plain text, with truncated set when the
+    model stopped at the max_tokens limit.
+    """
+
+    truncated = False
+
+    def __new__(cls, text: str, truncated: bool = False):
+        response = super().__new__(cls, text)
+        response.truncated = truncated
+        return response
+
+
+# Per-page prompt budget, schema prefix included
+MAX_PROMPT_TOKENS = 6000
+# Most page text sent per conversion (about the old 8000-character cut)
+MAX_TEXT_TOKENS = 2000
+# Pages with at most this much text go to the fast model first (model tiering)
+FAST_TIER_MAX_TOKENS = 500
+# Pages whose prompt is at most this many tokens can share a request
+MAX_PACKED_PAGE_TOKENS = 800
+# Upper bound for the combined prompt of a packed request
+MAX_PACKED_PROMPT_TOKENS = 20000
+
+
+class ProviderDispatcher:
+    """
+    Coalesces concurrent requests and dispatches them within account limits.
+
+    Submissions arriving within gather_window_ms of each other (or until
+    max_batch_size is reached) are released together, paced by a
+    requests-per-minute bucket and an optional tokens-per-minute bucket, with
+    at most max_concurrent requests in flight. This avoids firing every task at
+    once on start-up and then stalling on 429s.
+    """
+
+    def __init__(
+        self,
+        send,
+        requests_per_minute: float = 60.0,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrent: int = 5,
+        gather_window_ms: float = 80.0,
+        max_batch_size: int = 50
+    ):
+        """
+        Args:
+            send: Coroutine function (prompt, max_tokens, system, json_output) -> Optional[str]
+            requests_per_minute: Maximum requests started per minute
+            tokens_per_minute: Maximum estimated input tokens per minute (None for no limit)
+            max_concurrent: Maximum requests in flight at once
+            gather_window_ms: How long to collect submissions before dispatching
+            max_batch_size: Dispatch immediately once this many submissions are queued
+        """
+        self._send = send
+        self.gather_window = gather_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._request_limiter = AsyncRateLimiter(requests_per_minute, 60.0)
+        self._token_limiter = AsyncRateLimiter(tokens_per_minute, 60.0) if tokens_per_minute else None
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._pending: List[tuple] = []
+        self._tasks = set()
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_full: Optional[asyncio.Event] = None
+
+    async def submit(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        """Queue a request and wait for its response."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, max_tokens, system, json_output, future))
+
+        if self._worker is None or self._worker.done():
+            self._batch_full = asyncio.Event()
+            self._worker = loop.create_task(self._drain())
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+
+        return await future
+
+    async def _drain(self):
+        """Release queued submissions window by window until the queue is empty."""
+        batch: List[tuple] = []
+        dispatched = 0
+        try:
+            while self._pending:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.gather_window)
+                except asyncio.TimeoutError:
+                    pass
+                self._batch_full.clear()
+
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                dispatched = 0
+                if len(self._pending) >= self.max_batch_size:
+                    self._batch_full.set()
+
+                for prompt, max_tokens, system, json_output, future in batch:
+                    await self._request_limiter.acquire()
+                    if self._token_limiter:
+                        await self._token_limiter.acquire(estimate_tokens((system or "") + prompt))
+                    await self._slots.acquire()
+                    task = asyncio.create_task(
+                        self._dispatch(prompt, max_tokens, system, json_output, future)
+                    )
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                    dispatched += 1
+        finally:
+            # If draining stops early (e.g. cancelled), fail what was never sent
+            # rather than leaving its callers waiting forever
+            stranded = batch[dispatched:] + self._pending
+            self._pending = []
+            for *_, future in stranded:
+                if not future.done():
+                    future.set_exception(RuntimeError("Request dispatcher stopped before the request was sent"))
+
+    async def _dispatch(
+        self,
+        prompt: str,
+        max_tokens: int,
+        system: Optional[str],
+        json_output: bool,
+        future
+    ):
+        try:
+            result = await self._send(prompt, max_tokens, system, json_output)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._slots.release()
+            # Cancelled or interrupted mid-request; don't leave the caller waiting
+            if not future.done():
+                future.set_exception(RuntimeError("Request was interrupted before a response arrived"))
+
+
 class AIProvider(ABC):
     """Base class for AI providers."""
 
+    # Set by AIDataConverter.aconvert_all_pages to pace concurrent requests
+    dispatcher: Optional[ProviderDispatcher] = None
+
+    # Set by AIDataConverter.convert_all_pages to pace sequential requests
+    limiter: Optional[RateLimiter] = None
+
+    # Providers that implement submit_batch/collect_batch set this to True
+    supports_batch = False
+
+    # Errors worth retrying (rate limits, timeouts, 5xx); set by subclasses
+    retryable_errors: Tuple[type, ...] = ()
+    max_attempts = 4
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter: ~2s, 4s, 8s, ... capped at 60s."""
+        return min(60.0, 2.0 ** attempt) + random.uniform(0, 1)
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.max_attempts or not isinstance(error, self.retryable_errors):
+            return False
+        print(f"  {type(error).__name__} from {type(self).__name__}, "
+              f"retrying (attempt {attempt}/{self.max_attempts})")
+        return True
+
+    def _with_retries(self, call, *args, **kwargs):
+        """Call an SDK method, retrying transient failures."""
+        attempt = 1
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                return call(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                attempt += 1
+
+    async def _awith_retries(self, call, *args, **kwargs):
+        """Async version of _with_retries."""
+        attempt = 1
+        while True:
+            try:
+                return await call(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                attempt += 1
+
     @abstractmethod
-    def generate_response(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
-        """Generate a response from the AI provider."""
+    def generate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        """
+        Generate a response from the AI provider.
+
+        Args:
+            prompt: User prompt
+            max_tokens: Maximum tokens in the response
+            system: Static instructions shared across many calls. Providers place
+                this first and cache it where supported.
+            json_output: Ask for a bare JSON object using the provider's native
+                JSON mode, so the reply never arrives wrapped in markdown
+        """
         pass
 
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        """Generate a response without blocking the event loop."""
+        if self.dispatcher:
+            return await self.dispatcher.submit(prompt, max_tokens, system, json_output)
+        return await self._agenerate_response(prompt, max_tokens, system, json_output)
+
+    async def _agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        """Send a single request. Providers with native async clients override this."""
+        return await asyncio.to_thread(self.generate_response, prompt, max_tokens, system, json_output)
+
+    def submit_batch(
+        self,
+        prompts: Dict[str, str],
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> str:
+        """
+        Submit many prompts as a single asynchronous batch job.
+
+        Args:
+            prompts: Mapping of custom_id -> prompt
+            max_tokens: Maximum tokens per response
+            system: Static instructions shared by every prompt
+            json_output: Request bare JSON objects (see generate_response)
+
+        Returns:
+            Provider batch ID
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batch requests")
+
+    def collect_batch(self, batch_id: str, poll_interval: float = 30.0) -> Dict[str, Optional[str]]:
+        """
+        Wait for a batch job to finish and return its responses.
+
+        Returns:
+            Mapping of custom_id -> response text (None for failed requests)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batch requests")
+
 
 class GeminiProvider(AIProvider):
     """Google Gemini AI provider."""
 
+    # Seconds to wait for a single generate_content call
+    timeout = 120.0
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         import google.generativeai as genai
 
@@ -37,14 +428,89 @@ class GeminiProvider(AIProvider):
         # Use model from parameter, env var, or default
         model_name = model or os.environ.get("GEMINI_API_MODEL") or "gemini-2.0-flash-exp"
 
+        try:
+            from google.api_core import exceptions as google_exceptions
+            self.retryable_errors = (
+                google_exceptions.ResourceExhausted,
+                google_exceptions.ServiceUnavailable,
+                google_exceptions.InternalServerError,
+                google_exceptions.DeadlineExceeded,
+            )
+        except ImportError:
+            pass
+
         genai.configure(api_key=self.api_key)
+        self.genai = genai
         self.model = genai.GenerativeModel(model_name)
         self.model_name = model_name
+        self._system_models: Dict[str, Any] = {}
+
+    def _model_for(self, system: Optional[str]):
+        """Return a model bound to the given system instructions, creating it once."""
+        if not system:
+            return self.model
 
-    def generate_response(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
+        model = self._system_models.get(system)
+        if model is None:
+            try:
+                # Context caching stores the prefix server-side for an hour
+                from datetime import timedelta
+                cache = self.genai.caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=system,
+                    ttl=timedelta(hours=1)
+                )
+                model = self.genai.GenerativeModel.from_cached_content(cached_content=cache)
+            except Exception:
+                # Prefix is below the minimum cacheable size (or caching unsupported)
+                model = self.genai.GenerativeModel(self.model_name, system_instruction=system)
+            self._system_models[system] = model
+        return model
+
+    def _response_text(self, response) -> ProviderResponse:
+        finish_reason = response.candidates[0].finish_reason if response.candidates else None
+        truncated = getattr(finish_reason, 'name', finish_reason) == 'MAX_TOKENS'
+        return ProviderResponse(response.text, truncated)
+
+    def _generation_config(self, json_output: bool) -> Optional[Dict[str, Any]]:
+        if json_output:
+            return {"response_mime_type": "application/json"}
+        return None
+
+    def generate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            response = self._with_retries(
+                self._model_for(system).generate_content,
+                prompt,
+                generation_config=self._generation_config(json_output),
+                request_options={"timeout": self.timeout}
+            )
+            return self._response_text(response)
+        except Exception as e:
+            print(f"Error with Gemini API: {e}")
+            return None
+
+    async def _agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        try:
+            response = await self._awith_retries(
+                self._model_for(system).generate_content_async,
+                prompt,
+                generation_config=self._generation_config(json_output),
+                request_options={"timeout": self.timeout}
+            )
+            return self._response_text(response)
         except Exception as e:
             print(f"Error with Gemini API: {e}")
             return None
@@ -53,6 +519,15 @@ class GeminiProvider(AIProvider):
 class ClaudeProvider(AIProvider):
     """Anthropic Claude AI provider."""
 
+    supports_batch = True
+
+    # Claude has no JSON response mode; a forced tool call returns parsed JSON instead
+    json_tool = {
+        "name": "emit_json",
+        "description": "Return the requested data as a JSON object.",
+        "input_schema": {"type": "object"}
+    }
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
         if not self.api_key:
@@ -63,91 +538,285 @@ class ClaudeProvider(AIProvider):
 
         try:
             import anthropic
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            # Retries are handled by _with_retries so failures are visible
+            timeout = anthropic.Timeout(connect=5.0, read=120.0, write=10.0, pool=5.0)
+            self.client = anthropic.Anthropic(api_key=self.api_key, timeout=timeout, max_retries=0)
+            self.async_client = anthropic.AsyncAnthropic(
+                api_key=self.api_key, timeout=timeout, max_retries=0
+            )
+            self.retryable_errors = (
+                anthropic.RateLimitError,
+                anthropic.APIConnectionError,
+                anthropic.InternalServerError,
+            )
         except ImportError:
             raise ImportError("anthropic package not installed. Run: pip install anthropic")
 
-    def generate_response(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
+    def _request_params(
+        self,
+        prompt: str,
+        max_tokens: int,
+        system: Optional[str],
+        json_output: bool = False
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters."""
+        params = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if system:
+            # Mark the shared prefix as cacheable so later calls reuse it
+            params["system"] = [
+                {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
+            ]
+        if json_output:
+            params["tools"] = [self.json_tool]
+            params["tool_choice"] = {"type": "tool", "name": self.json_tool["name"]}
+        return params
+
+    def _message_text(self, message) -> ProviderResponse:
+        """Return the reply text, or the tool input as JSON for json_output requests."""
+        truncated = message.stop_reason == "max_tokens"
+        for block in message.content:
+            if block.type == "tool_use":
+                return ProviderResponse(json_utils.dumps(block.input), truncated)
+        return ProviderResponse(message.content[0].text, truncated)
+
+    def generate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            message = self._with_retries(
+                self.client.messages.create,
+                **self._request_params(prompt, max_tokens, system, json_output)
             )
-            return message.content[0].text
+            return self._message_text(message)
         except Exception as e:
             print(f"Error with Claude API: {e}")
             return None
 
+    async def _agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        try:
+            message = await self._awith_retries(
+                self.async_client.messages.create,
+                **self._request_params(prompt, max_tokens, system, json_output)
+            )
+            return self._message_text(message)
+        except Exception as e:
+            print(f"Error with Claude API: {e}")
+            return None
+
+    def submit_batch(
+        self,
+        prompts: Dict[str, str],
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> str:
+        batch = self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": self._request_params(prompt, max_tokens, system, json_output)
+                }
+                for custom_id, prompt in prompts.items()
+            ]
+        )
+        return batch.id
+
+    def collect_batch(self, batch_id: str, poll_interval: float = 30.0) -> Dict[str, Optional[str]]:
+        while True:
+            batch = self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                break
+            time.sleep(poll_interval)
+
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = self._message_text(entry.result.message)
+            else:
+                print(f"  Batch request {entry.custom_id} {entry.result.type}")
+                results[entry.custom_id] = None
+        return results
+
 
 class OpenAIProvider(AIProvider):
     """OpenAI GPT provider."""
 
+    supports_batch = True
+
+    # Overridden by OpenAI-compatible providers
+    display_name = "OpenAI"
+    api_key_env = "OPENAI_API_KEY"
+    model_env = "OPENAI_API_MODEL"
+    default_model = "gpt-4-turbo-preview"
+    base_url: Optional[str] = None
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
-        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.api_key = api_key or os.environ.get(self.api_key_env)
         if not self.api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
+            raise ValueError(f"{self.api_key_env} environment variable not set")
 
         # Use model from parameter, env var, or default
-        self.model = model or os.environ.get("OPENAI_API_MODEL") or "gpt-4-turbo-preview"
+        self.model = model or os.environ.get(self.model_env) or self.default_model
 
         try:
             import openai
-            self.client = openai.OpenAI(api_key=self.api_key)
+            # Retries are handled by _with_retries so failures are visible
+            client_options = {
+                "api_key": self.api_key,
+                "base_url": self.base_url,
+                "timeout": openai.Timeout(connect=5.0, read=120.0, write=10.0, pool=5.0),
+                "max_retries": 0,
+            }
+            self.client = openai.OpenAI(**client_options)
+            self.async_client = openai.AsyncOpenAI(**client_options)
+            self.retryable_errors = (
+                openai.RateLimitError,
+                openai.APIConnectionError,
+                openai.InternalServerError,
+            )
         except ImportError:
             raise ImportError("openai package not installed. Run: pip install openai")
 
-    def generate_response(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
+    def _request_params(
+        self,
+        prompt: str,
+        max_tokens: int,
+        system: Optional[str],
+        json_output: bool = False
+    ) -> Dict[str, Any]:
+        """Build chat.completions.create parameters."""
+        messages = []
+        if system:
+            # Static content goes first so automatic prefix caching can apply
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens
+        }
+        if json_output:
+            params["response_format"] = {"type": "json_object"}
+        return params
+
+    def generate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens
+            response = self._with_retries(
+                self.client.chat.completions.create,
+                **self._request_params(prompt, max_tokens, system, json_output)
             )
-            return response.choices[0].message.content
+            choice = response.choices[0]
+            return ProviderResponse(choice.message.content or "", choice.finish_reason == "length")
         except Exception as e:
-            print(f"Error with OpenAI API: {e}")
+            print(f"Error with {self.display_name} API: {e}")
             return None
 
+    async def _agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> Optional[str]:
+        try:
+            response = await self._awith_retries(
+                self.async_client.chat.completions.create,
+                **self._request_params(prompt, max_tokens, system, json_output)
+            )
+            choice = response.choices[0]
+            return ProviderResponse(choice.message.content or "", choice.finish_reason == "length")
+        except Exception as e:
+            print(f"Error with {self.display_name} API: {e}")
+            return None
 
-class GrokProvider(AIProvider):
-    """xAI Grok provider."""
+    def submit_batch(
+        self,
+        prompts: Dict[str, str],
+        max_tokens: int = 4000,
+        system: Optional[str] = None,
+        json_output: bool = False
+    ) -> str:
+        lines = [
+            json_utils.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_params(prompt, max_tokens, system, json_output)
+            })
+            for custom_id, prompt in prompts.items()
+        ]
+        batch_file = self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def collect_batch(self, batch_id: str, poll_interval: float = 30.0) -> Dict[str, Optional[str]]:
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            time.sleep(poll_interval)
+
+        if batch.status != "completed":
+            print(f"  Batch {batch_id} finished with status: {batch.status}")
+
+        results = {}
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json_utils.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    choice = response["body"]["choices"][0]
+                    results[record["custom_id"]] = ProviderResponse(
+                        choice["message"]["content"] or "", choice.get("finish_reason") == "length"
+                    )
+                else:
+                    results[record["custom_id"]] = None
+        return results
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
-        self.api_key = api_key or os.environ.get("XAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("XAI_API_KEY environment variable not set")
 
-        # Use model from parameter, env var, or default
-        self.model = model or os.environ.get("XAI_API_MODEL") or "grok-beta"
+class GrokProvider(OpenAIProvider):
+    """xAI Grok provider (OpenAI-compatible API)."""
 
-        try:
-            import openai
-            # Grok uses OpenAI SDK with custom base URL
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url="https://api.x.ai/v1"
-            )
-        except ImportError:
-            raise ImportError("openai package not installed. Run: pip install openai")
+    supports_batch = False
 
-    def generate_response(self, prompt: str, max_tokens: int = 4000) -> Optional[str]:
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error with Grok API: {e}")
-            return None
+    display_name = "Grok"
+    api_key_env = "XAI_API_KEY"
+    model_env = "XAI_API_MODEL"
+    default_model = "grok-beta"
+    # Grok uses OpenAI SDK with custom base URL
+    base_url = "https://api.x.ai/v1"
 
 
 class AIDataConverter:
@@ -155,16 +824,33 @@ class AIDataConverter:
     Converts scraped website data into structured JSON using AI.
     """
 
-    def __init__(self, provider: str = "gemini", **provider_kwargs):
+    def __init__(
+        self,
+        provider: str = "gemini",
+        cache_dir: Optional[str] = "./.ai_cache",
+        fast_model: Optional[str] = None,
+        output_format: str = "json",
+        **provider_kwargs
+    ):
         """
         Initialize the converter with an AI provider.
 
         Args:
             provider: AI provider name ('gemini', 'claude', 'openai', or 'grok')
+            cache_dir: Directory for the on-disk conversion cache (None to disable)
+            fast_model: Cheaper model of the same provider to try first on small
+                pages (e.g. gpt-4o-mini, gemini-1.5-flash). Results that don't
+                match the schema are redone with the main model.
+            output_format: 'json' for a pretty-printed array, 'ndjson' for one
+                compact object per line
             **provider_kwargs: Additional arguments for the provider
         """
         self.provider_name = provider.lower()
 
+        if output_format not in ("json", "ndjson"):
+            raise ValueError(f"Unknown output format: {output_format}. Use 'json' or 'ndjson'")
+        self.output_format = output_format
+
         if self.provider_name == "gemini":
             self.provider = GeminiProvider(**provider_kwargs)
         elif self.provider_name == "claude":
@@ -176,8 +862,68 @@ class AIDataConverter:
         else:
             raise ValueError(f"Unknown provider: {provider}. Use 'gemini', 'claude', 'openai', or 'grok'")
 
+        # Conversions are memoized by prompt hash so duplicate pages and re-runs
+        # don't pay for another API call
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Entries already read from or written to disk, so a warm re-run opens
+        # the shelf once per page instead of once per lookup
+        self._cache_memo: Dict[str, Dict] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._prefix_tokens: Dict[str, int] = {}
+        self._prefix_hashers: Dict[str, Any] = {}
+
+        # Model tiering: small pages go to the cheaper model first
+        self.fast_provider = None
+        if fast_model:
+            self.fast_provider = type(self.provider)(api_key=self.provider.api_key, model=fast_model)
+        # tier -> [accepted, attempted]
+        self.tier_stats: Dict[str, List[int]] = {"fast": [0, 0], "primary": [0, 0]}
+
         print(f"Initialized AI converter with {self.provider_name} provider")
 
+    def _cache_key(self, prefix: str, prompt: str, provider: Optional[AIProvider] = None) -> str:
+        """
+        Hash everything that determines a conversion result.
+
+        The key includes the model that produced the result, so pages the fast
+        model converted are never served as the main model's output.
+        """
+        provider = provider or self.provider
+        # Every page shares the schema prefix, so it is hashed once and the
+        # saved hasher state is copied for each prompt
+        hasher = self._prefix_hashers.get((provider, prefix))
+        if hasher is None:
+            model = getattr(provider, 'model_name', None) or getattr(provider, 'model', '')
+            key_source = "\0".join([self.provider_name, str(model), prefix, ""])
+            hasher = hashlib.blake2b(key_source.encode('utf-8'), digest_size=32)
+            self._prefix_hashers[(provider, prefix)] = hasher
+        hasher = hasher.copy()
+        hasher.update(prompt.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        """Look up a cached conversion."""
+        if not self.cache_dir:
+            return None
+        if key in self._cache_memo:
+            # Callers attach metadata in place, so hand out a copy
+            return copy.deepcopy(self._cache_memo[key])
+        with shelve.open(str(self.cache_dir / "conversions")) as cache:
+            structured = cache.get(key)
+        if structured is not None:
+            self._cache_memo[key] = copy.deepcopy(structured)
+        return structured
+
+    def _cache_set(self, key: str, structured: Dict):
+        """Store a successful conversion."""
+        if not self.cache_dir:
+            return
+        with shelve.open(str(self.cache_dir / "conversions")) as cache:
+            cache[key] = structured
+        self._cache_memo[key] = copy.deepcopy(structured)
+
     def analyze_data_structure(self, scraped_data: List[Dict]) -> Dict[str, Any]:
         """
         Analyze the scraped data to determine the optimal structure.
@@ -204,7 +950,7 @@ The data comes from {len(scraped_data)} pages. Here are {sample_size} sample pag
             prompt += f"\n--- Page {i} ---\n"
             prompt += f"URL: {page['url']}\n"
             prompt += f"Title: {page['title']}\n"
-            prompt += f"Headings: {json.dumps(page['headings'][:5], indent=2)}\n"
+            prompt += f"Headings: {json_utils.dumps(page['headings'][:5])}\n"
             if page.get('tables'):
                 prompt += f"Has {len(page['tables'])} table(s)\n"
             prompt += f"Content sample (first 500 chars): {page['text_content'][:500]}...\n"
@@ -227,7 +973,7 @@ Format your response as a JSON object with these keys:
 Return ONLY the JSON object, no other text.
 """
 
-        response = self.provider.generate_response(prompt, max_tokens=4000)
+        response = self.provider.generate_response(prompt, max_tokens=4000, json_output=True)
 
         if not response:
             return {
@@ -248,7 +994,7 @@ Return ONLY the JSON object, no other text.
             if response.endswith("```"):
                 response = response[:-3]
 
-            analysis = json.loads(response.strip())
+            analysis = json_utils.loads(response)
             return analysis
         except json.JSONDecodeError as e:
             print(f"Failed to parse analysis JSON: {e}")
@@ -261,83 +1007,338 @@ Return ONLY the JSON object, no other text.
                 "notes": f"Failed to parse analysis: {str(e)}"
             }
 
-    def convert_page_to_structured_data(
-        self,
-        page_data: Dict,
-        schema: Dict,
-        context: Optional[str] = None
-    ) -> Optional[Dict]:
+    def _build_conversion_prefix(self, schema: Dict) -> str:
         """
-        Convert a single page to structured data based on the schema.
-
-        Args:
-            page_data: Scraped page data
-            schema: Target JSON schema
-            context: Additional context about the data
+        Build the static part of the conversion prompt.
 
-        Returns:
-            Structured data following the schema
+        The schema and instructions are identical for every page, so they are
+        sent as the system prompt where providers can cache them. The schema is
+        serialized compactly: indentation only costs tokens.
         """
-        # Create conversion prompt
-        prompt = f"""Convert the following webpage content into structured JSON data according to the provided schema.
+        schema_str = json_utils.dumps(schema)
+        return f"""Convert webpage content into structured JSON data according to the provided schema.
 
 TARGET SCHEMA:
-{json.dumps(schema, indent=2)}
+{schema_str}
+
+Extract and structure the data according to the schema. Return ONLY a valid JSON object that follows the schema, no other text.
+If certain fields cannot be extracted, use null or appropriate empty values.
+"""
 
-WEBPAGE DATA:
+    def _build_conversion_prompt(
+        self,
+        page_data: Dict,
+        context: Optional[str] = None,
+        prefix: Optional[str] = None
+    ) -> str:
+        """
+        Build the per-page part of the conversion prompt.
+
+        Page text is trimmed on a token boundary so that, together with the
+        schema prefix, headings and tables, the prompt fits MAX_PROMPT_TOKENS.
+        """
+        prompt = f"""WEBPAGE DATA:
 URL: {page_data['url']}
 Title: {page_data['title']}
 
 Headings:
-{json.dumps(page_data['headings'], indent=2)}
+{json_utils.dumps(page_data['headings'])}
 
 """
 
         if page_data.get('tables'):
-            prompt += f"\nTables:\n{json.dumps(page_data['tables'], indent=2)}\n"
+            prompt += f"\nTables:\n{json_utils.dumps(page_data['tables'])}\n"
+
+        text_budget = MAX_TEXT_TOKENS
+        if prefix:
+            if prefix not in self._prefix_tokens:
+                self._prefix_tokens[prefix] = estimate_tokens(prefix)
+            remaining = MAX_PROMPT_TOKENS - self._prefix_tokens[prefix] - estimate_tokens(prompt)
+            # Never starve the text entirely because of a huge schema or table dump
+            text_budget = max(min(text_budget, remaining), MAX_TEXT_TOKENS // 4)
 
         prompt += f"""
 Text Content:
-{page_data['text_content'][:8000]}
+{truncate_to_tokens(page_data['text_content'], text_budget)}
 
 """
 
         if context:
             prompt += f"\nADDITIONAL CONTEXT:\n{context}\n"
 
-        prompt += """
-Extract and structure the data according to the schema. Return ONLY a valid JSON object that follows the schema, no other text.
-If certain fields cannot be extracted, use null or appropriate empty values.
-"""
+        return prompt
 
-        response = self.provider.generate_response(prompt, max_tokens=4000)
+    def _strip_fences(self, response: str) -> str:
+        """Remove a markdown code fence around a JSON reply."""
+        response = response.strip()
+        if response.startswith("```json"):
+            response = response[7:]
+        elif response.startswith("```"):
+            response = response[3:]
+        if response.endswith("```"):
+            response = response[:-3]
+        return response
 
+    def _parse_conversion_response(
+        self,
+        response: Optional[str],
+        url: str,
+        schema: Optional[Dict] = None
+    ) -> Optional[Dict]:
+        """
+        Parse the AI response for a page conversion.
+
+        A reply cut off mid-object is salvaged with json_utils.loads_partial;
+        the result is marked with '_partial' so it isn't cached.
+        """
         if not response:
             return None
 
+        # Requests use JSON mode, but strip markdown fences in case a model ignores it
+        response = self._strip_fences(response)
         try:
-            # Extract JSON from response
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            elif response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-
-            structured_data = json.loads(response.strip())
-            return structured_data
+            return json_utils.loads(response)
         except json.JSONDecodeError as e:
-            print(f"Failed to parse conversion JSON for {page_data['url']}: {e}")
+            error = e
+
+        try:
+            structured = json_utils.loads_partial(response)
+        except json.JSONDecodeError:
+            structured = None
+        if not isinstance(structured, dict) or not structured:
+            print(f"Failed to parse conversion JSON for {url}: {error}")
             return None
 
+        expected = (schema or {}).get('properties', schema or {})
+        missing = [key for key in expected if key not in structured] if isinstance(expected, dict) else []
+        print(f"  Recovered partial JSON for {url} ({len(structured)} fields"
+              + (f", missing: {', '.join(missing)})" if missing else ")"))
+        structured['_partial'] = True
+        return structured
+
+    def _continuation_prompt(self, prompt: str, partial: str) -> str:
+        """Ask the model to carry on from where a truncated reply stopped."""
+        return f"""{prompt}
+Your previous answer was cut off by the length limit. It ended with:
+{partial[-2000:]}
+
+Continue the JSON exactly where it stops. Output only the remaining characters, without repeating anything and without markdown.
+"""
+
+    def _needs_continuation(self, response: Optional[str]) -> bool:
+        """True for a reply that hit max_tokens and isn't already complete JSON."""
+        if not response or not getattr(response, 'truncated', False):
+            return False
+        try:
+            json_utils.loads(self._strip_fences(response))
+            return False
+        except json.JSONDecodeError:
+            return True
+
+    def _generate_conversion(self, provider: AIProvider, prompt: str, prefix: str) -> Optional[str]:
+        """Request a conversion, following up once if the reply was truncated."""
+        response = provider.generate_response(prompt, max_tokens=4000, system=prefix, json_output=True)
+        if self._needs_continuation(response):
+            print(f"  Response hit the token limit, requesting the rest")
+            rest = provider.generate_response(
+                self._continuation_prompt(prompt, response), max_tokens=4000, system=prefix
+            )
+            response = self._strip_fences(response) + (self._strip_fences(rest) if rest else "")
+        return response
+
+    async def _agenerate_conversion(self, provider: AIProvider, prompt: str, prefix: str) -> Optional[str]:
+        """Async version of _generate_conversion."""
+        response = await provider.agenerate_response(prompt, max_tokens=4000, system=prefix, json_output=True)
+        if self._needs_continuation(response):
+            print(f"  Response hit the token limit, requesting the rest")
+            rest = await provider.agenerate_response(
+                self._continuation_prompt(prompt, response), max_tokens=4000, system=prefix
+            )
+            response = self._strip_fences(response) + (self._strip_fences(rest) if rest else "")
+        return response
+
+    def convert_page_to_structured_data(
+        self,
+        page_data: Dict,
+        schema: Dict,
+        context: Optional[str] = None,
+        prefix: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Convert a single page to structured data based on the schema.
+
+        Args:
+            page_data: Scraped page data
+            schema: Target JSON schema
+            context: Additional context about the data
+            prefix: Precomputed _build_conversion_prefix(schema), reused across pages
+
+        Returns:
+            Structured data following the schema
+        """
+        if not page_data.get('text_content', '').strip():
+            print(f"  No text content, skipping")
+            return None
+
+        prefix = prefix or self._build_conversion_prefix(schema)
+        prompt = self._build_conversion_prompt(page_data, context, prefix)
+
+        key, fast_key = self._conversion_keys(page_data, prefix, prompt)
+        cached = self._cache_get(key) or (fast_key and self._cache_get(fast_key))
+        if cached:
+            print(f"  Using cached conversion")
+            return cached
+
+        # Results are cached under the key of the model that produced them
+        structured, result_key = None, fast_key
+        if fast_key:
+            response = self._generate_conversion(self.fast_provider, prompt, prefix)
+            structured = self._check_fast_tier(
+                self._parse_conversion_response(response, page_data['url'], schema), schema
+            )
+
+        if structured is None:
+            response = self._generate_conversion(self.provider, prompt, prefix)
+            structured = self._parse_conversion_response(response, page_data['url'], schema)
+            self._record_tier("primary", structured is not None)
+            result_key = key
+
+        if structured and not structured.get('_partial'):
+            self._cache_set(result_key, structured)
+        return structured
+
+    async def aconvert_page_to_structured_data(
+        self,
+        page_data: Dict,
+        schema: Dict,
+        context: Optional[str] = None,
+        prefix: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Async version of convert_page_to_structured_data.
+
+        Concurrent calls with an identical prompt share a single API request.
+        """
+        if not page_data.get('text_content', '').strip():
+            print(f"  No text content, skipping")
+            return None
+
+        prefix = prefix or self._build_conversion_prefix(schema)
+        prompt = self._build_conversion_prompt(page_data, context, prefix)
+
+        key, fast_key = self._conversion_keys(page_data, prefix, prompt)
+        cached = self._cache_get(key) or (fast_key and self._cache_get(fast_key))
+        if cached:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            structured = await inflight
+            return copy.deepcopy(structured) if structured else None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        structured, result_key = None, fast_key
+        try:
+            if fast_key:
+                response = await self._agenerate_conversion(self.fast_provider, prompt, prefix)
+                structured = self._check_fast_tier(
+                    self._parse_conversion_response(response, page_data['url'], schema), schema
+                )
+
+            if structured is None:
+                response = await self._agenerate_conversion(self.provider, prompt, prefix)
+                structured = self._parse_conversion_response(response, page_data['url'], schema)
+                self._record_tier("primary", structured is not None)
+                result_key = key
+
+            if structured and not structured.get('_partial'):
+                self._cache_set(result_key, structured)
+        finally:
+            future.set_result(structured)
+            del self._inflight[key]
+
+        return copy.deepcopy(structured) if structured else None
+
+    def _conversion_keys(self, page_data: Dict, prefix: str, prompt: str) -> Tuple[str, Optional[str]]:
+        """Cache keys for the main model and, if the page goes to it, the fast model."""
+        fast_key = self._cache_key(prefix, prompt, self.fast_provider) if self._use_fast_tier(page_data) else None
+        return self._cache_key(prefix, prompt), fast_key
+
+    def _use_fast_tier(self, page_data: Dict) -> bool:
+        """Small pages are tried on the fast model first when one is configured."""
+        return (self.fast_provider is not None
+                and estimate_tokens(page_data['text_content']) <= FAST_TIER_MAX_TOKENS)
+
+    def _record_tier(self, tier: str, accepted: bool) -> bool:
+        self.tier_stats[tier][1] += 1
+        if accepted:
+            self.tier_stats[tier][0] += 1
+        return accepted
+
+    def _check_fast_tier(self, structured: Optional[Dict], schema: Dict) -> Optional[Dict]:
+        """Return the fast model's result if it fits the schema, otherwise None."""
+        accepted = (structured is not None and not structured.get('_partial')
+                    and self._matches_schema(structured, schema))
+        if self._record_tier("fast", accepted):
+            return structured
+        print(f"  Fast model result rejected, retrying with the main model")
+        return None
+
+    def _matches_schema(self, structured: Dict, schema: Dict) -> bool:
+        """
+        Check a converted page against the target schema.
+
+        Generated schemas are often example-shaped rather than strict JSON
+        Schema, so jsonschema is only used when the schema looks like one and
+        the package is installed; otherwise at least one top-level schema key
+        must be present in the result.
+        """
+        if not isinstance(structured, dict) or not structured:
+            return False
+
+        if '$schema' in schema or 'properties' in schema:
+            try:
+                import jsonschema
+                try:
+                    jsonschema.validate(structured, schema)
+                    return True
+                except jsonschema.ValidationError:
+                    return False
+                except jsonschema.SchemaError:
+                    pass
+            except ImportError:
+                pass
+
+        expected = schema.get('properties', schema)
+        if not isinstance(expected, dict) or not expected:
+            return True
+        return any(key in structured for key in expected)
+
+    def _add_metadata(self, structured: Dict, page_data: Dict) -> Dict:
+        """Attach source metadata to a converted page."""
+        partial = structured.pop('_partial', False)
+        structured['_metadata'] = {
+            'source_url': page_data['url'],
+            'title': page_data['title'],
+            'scraped_at': page_data['fetched_at'],
+            'url_hash': page_data['url_hash']
+        }
+        if partial:
+            # Salvaged from a truncated response; some fields may be missing
+            structured['_metadata']['partial'] = True
+        return structured
+
     def convert_all_pages(
         self,
         scraped_data: List[Dict],
         schema: Dict,
         output_file: str,
         batch_size: int = 10,
-        delay: float = 1.0
+        delay: float = 1.0,
+        use_batch: bool = False,
+        poll_interval: float = 30.0,
+        pages_per_call: int = 1
     ) -> List[Dict]:
         """
         Convert all scraped pages to structured JSON.
@@ -345,57 +1346,450 @@ If certain fields cannot be extracted, use null or appropriate empty values.
         Args:
             scraped_data: List of scraped page data
             schema: Target JSON schema
-            output_file: Path to save the output JSON
-            batch_size: Number of pages to process before saving
-            delay: Delay between API calls in seconds
+            output_file: Path to save the output JSON. Pages are appended to
+                output_file + '.jsonl' as they convert, so an interrupted run
+                resumes where it stopped.
+            batch_size: Number of pages between progress reports
+            delay: Minimum seconds between the starts of consecutive API calls.
+                Cached pages make no call and don't wait.
+            use_batch: Submit all pages as one provider batch job (Claude/OpenAI only).
+                Batches are billed at a discount but may take up to 24 hours.
+            poll_interval: Seconds between batch status checks
+            pages_per_call: Convert up to this many short pages in a single request,
+                so the schema prefix and request overhead are shared between them
 
         Returns:
             List of structured data objects
         """
         print(f"Converting {len(scraped_data)} pages to structured JSON...")
 
-        structured_data = []
+        if use_batch:
+            if self.provider.supports_batch:
+                return self._convert_all_pages_batch(scraped_data, schema, output_file, poll_interval)
+            print(f"  {self.provider_name} does not support batch requests, converting sequentially")
+
+        # The schema prefix is identical for every page; build it once
+        prefix = self._build_conversion_prefix(schema)
+        converted = self._load_progress(output_file)
+        pending = [page_data for page_data in scraped_data if page_data['url'] not in converted]
+        groups = self._pack_pages(pending, prefix, pages_per_call)
         failed_urls = []
 
-        for i, page_data in enumerate(scraped_data, 1):
-            print(f"Processing page {i}/{len(scraped_data)}: {page_data['url']}")
+        # Pace actual provider calls rather than sleeping after every page
+        providers = [p for p in (self.provider, self.fast_provider) if p is not None]
+        previous_limiters = [p.limiter for p in providers]
+        limiter = RateLimiter(1, delay) if delay > 0 else None
+        for p in providers:
+            p.limiter = limiter
+
+        try:
+            self._convert_groups(groups, schema, prefix, output_file, converted, failed_urls, batch_size)
+        finally:
+            for p, previous in zip(providers, previous_limiters):
+                p.limiter = previous
+
+        structured_data = self._finalize_output(output_file, scraped_data, converted)
+        self._print_summary(structured_data, failed_urls)
 
+        return structured_data
+
+    def _convert_groups(
+        self,
+        groups: List[List[Dict]],
+        schema: Dict,
+        prefix: str,
+        output_file: str,
+        converted: Dict[str, Dict],
+        failed_urls: List[str],
+        batch_size: int
+    ):
+        """Convert packed page groups in order, appending results to the progress file."""
+        total = sum(len(group) for group in groups)
+        position = 0
+
+        with self._open_progress(output_file) as progress:
+            for group in groups:
+                results = None
+                if len(group) > 1:
+                    print(f"Processing pages {position + 1}-{position + len(group)}/{total} "
+                          f"in one request")
+                    try:
+                        results = self._convert_packed(group, prefix)
+                    except Exception as e:
+                        print(f"  Error processing pages: {e}")
+                    if results is None:
+                        print(f"  Packed response didn't match the pages, converting one by one")
+
+                if results is None:
+                    results = [
+                        self._convert_page_logged(page_data, schema, prefix, position + k + 1, total)
+                        for k, page_data in enumerate(group)
+                    ]
+
+                for page_data, structured in zip(group, results):
+                    position += 1
+                    if structured:
+                        converted[page_data['url']] = self._add_metadata(structured, page_data)
+                        self._append_progress(progress, converted[page_data['url']])
+                    else:
+                        failed_urls.append(page_data['url'])
+
+                    if position % batch_size == 0:
+                        print(f"  Progress: {len(converted)} pages converted")
+
+    def _convert_page_logged(
+        self,
+        page_data: Dict,
+        schema: Dict,
+        prefix: str,
+        position: int,
+        total: int
+    ) -> Optional[Dict]:
+        """Convert one page for convert_all_pages, reporting failures instead of raising."""
+        print(f"Processing page {position}/{total}: {page_data['url']}")
+
+        try:
+            structured = self.convert_page_to_structured_data(page_data, schema, prefix=prefix)
+            if not structured:
+                print(f"  Failed to convert page")
+            return structured
+        except Exception as e:
+            print(f"  Error processing page: {e}")
+            return None
+
+    def _pack_pages(self, pages: List[Dict], prefix: str, pages_per_call: int) -> List[List[Dict]]:
+        """
+        Group short pages so each group can be converted with one request.
+
+        Long pages, empty pages and pages already in the conversion cache stay
+        on their own.
+        """
+        groups = []
+        group: List[Dict] = []
+        group_tokens = 0
+
+        for page_data in pages:
+            prompt = self._build_conversion_prompt(page_data, prefix=prefix)
+            tokens = estimate_tokens(prompt)
+            if (pages_per_call <= 1 or tokens > MAX_PACKED_PAGE_TOKENS
+                    or not page_data.get('text_content', '').strip()
+                    or self._cache_get(self._cache_key(prefix, prompt)) is not None):
+                groups.append([page_data])
+                continue
+
+            if group and (len(group) >= pages_per_call or group_tokens + tokens > MAX_PACKED_PROMPT_TOKENS):
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(page_data)
+            group_tokens += tokens
+
+        if group:
+            groups.append(group)
+        return groups
+
+    def _convert_packed(self, pages: List[Dict], prefix: str) -> Optional[List[Dict]]:
+        """
+        Convert several pages with a single request.
+
+        Returns:
+            Structured data for each page in order, or None if the response
+            doesn't contain exactly one object per page
+        """
+        page_prompts, prompt = self._build_packed_prompt(pages, prefix)
+        response = self.provider.generate_response(prompt, max_tokens=4000, system=prefix, json_output=True)
+        return self._parse_packed_response(response, page_prompts, prefix)
+
+    async def _aconvert_packed(self, pages: List[Dict], prefix: str) -> Optional[List[Dict]]:
+        """Async version of _convert_packed."""
+        page_prompts, prompt = self._build_packed_prompt(pages, prefix)
+        response = await self.provider.agenerate_response(prompt, max_tokens=4000, system=prefix, json_output=True)
+        return self._parse_packed_response(response, page_prompts, prefix)
+
+    def _build_packed_prompt(self, pages: List[Dict], prefix: str) -> Tuple[List[str], str]:
+        """Build the per-page prompts and the combined prompt for a packed request."""
+        page_prompts = [self._build_conversion_prompt(page_data, prefix=prefix) for page_data in pages]
+        prompt = (
+            f"The {len(pages)} pages below are separate. Convert each one on its own and return "
+            f'a JSON object of the form {{"pages": [...]}} where the "pages" array has exactly '
+            f"{len(pages)} items, item i being the structured data for PAGE i.\n"
+        )
+        for n, page_prompt in enumerate(page_prompts, 1):
+            prompt += f"\nPAGE {n}:\n{page_prompt}"
+        return page_prompts, prompt
+
+    def _parse_packed_response(
+        self,
+        response: Optional[str],
+        page_prompts: List[str],
+        prefix: str
+    ) -> Optional[List[Dict]]:
+        """Split a packed response into one object per page, caching each of them."""
+        parsed = self._parse_conversion_response(response, f"{len(page_prompts)} packed pages")
+        if isinstance(parsed, dict) and parsed.get('_partial'):
+            return None
+        items = parsed.get('pages') if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list) or len(items) != len(page_prompts):
+            return None
+        if not all(isinstance(item, dict) for item in items):
+            return None
+
+        # Cache per page so later single-page runs reuse these results
+        for page_prompt, item in zip(page_prompts, items):
+            self._cache_set(self._cache_key(prefix, page_prompt), item)
+        return items
+
+    async def aconvert_all_pages(
+        self,
+        scraped_data: List[Dict],
+        schema: Dict,
+        output_file: str,
+        batch_size: int = 10,
+        max_concurrent: int = 5,
+        requests_per_minute: float = 30.0,
+        tokens_per_minute: Optional[float] = None,
+        pages_per_call: int = 1
+    ) -> List[Dict]:
+        """
+        Convert all scraped pages concurrently.
+
+        Requests go through a ProviderDispatcher that keeps up to
+        max_concurrent requests in flight within the RPM/TPM limits.
+        Short pages are packed pages_per_call to a request, as in convert_all_pages.
+
+        Args:
+            scraped_data: List of scraped page data
+            schema: Target JSON schema
+            output_file: Path to save the output JSON (progress goes to output_file + '.jsonl')
+            batch_size: Number of completed pages between progress reports
+            max_concurrent: Maximum number of simultaneous API requests
+            requests_per_minute: Maximum API requests per minute
+            tokens_per_minute: Maximum estimated input tokens per minute (None for no limit)
+            pages_per_call: Convert up to this many short pages in a single request
+
+        Returns:
+            List of structured data objects, in the same order as scraped_data
+        """
+        print(f"Converting {len(scraped_data)} pages to structured JSON "
+              f"({max_concurrent} concurrent, {requests_per_minute:g} requests/min)...")
+
+        prefix = self._build_conversion_prefix(schema)
+        converted = self._load_progress(output_file)
+        pending = [page_data for page_data in scraped_data if page_data['url'] not in converted]
+        groups = self._pack_pages(pending, prefix, pages_per_call)
+        positions = {page_data['url']: i for i, page_data in enumerate(scraped_data)}
+        total = len(scraped_data)
+        write_lock = asyncio.Lock()
+
+        async def _convert_one(index: int, page_data: Dict, progress) -> Optional[Dict]:
+            structured = await self.aconvert_page_to_structured_data(page_data, schema, prefix=prefix)
+
+            print(f"Processed page {index + 1}/{total}: {page_data['url']}")
+            if not structured:
+                print(f"  Failed to convert page")
+                return None
+
+            converted[page_data['url']] = self._add_metadata(structured, page_data)
+            async with write_lock:
+                await asyncio.to_thread(self._append_progress, progress, converted[page_data['url']])
+            if len(converted) % batch_size == 0:
+                print(f"  Progress: {len(converted)} pages converted")
+            return converted[page_data['url']]
+
+        async def _convert_group(group: List[Dict], progress) -> List[Optional[Dict]]:
+            if len(group) > 1:
+                results = None
+                try:
+                    results = await self._aconvert_packed(group, prefix)
+                except Exception as e:
+                    print(f"  Error processing {len(group)} packed pages: {e}")
+                if results is not None:
+                    structured_pages = []
+                    for page_data, structured in zip(group, results):
+                        print(f"Processed page {positions[page_data['url']] + 1}/{total} "
+                              f"(packed): {page_data['url']}")
+                        converted[page_data['url']] = self._add_metadata(structured, page_data)
+                        structured_pages.append(converted[page_data['url']])
+                    async with write_lock:
+                        for structured in structured_pages:
+                            await asyncio.to_thread(self._append_progress, progress, structured)
+                    return structured_pages
+                print(f"  Packed response didn't match the pages, converting one by one")
+
+            return await asyncio.gather(
+                *(_convert_one(positions[page_data['url']], page_data, progress) for page_data in group),
+                return_exceptions=True
+            )
+
+        # Rate limits are per model, so each tier gets its own dispatcher
+        providers = [p for p in (self.provider, self.fast_provider) if p is not None]
+        previous_dispatchers = [p.dispatcher for p in providers]
+        for p in providers:
+            p.dispatcher = ProviderDispatcher(
+                p._agenerate_response,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrent=max_concurrent
+            )
+        try:
+            with self._open_progress(output_file) as progress:
+                group_results = await asyncio.gather(
+                    *(_convert_group(group, progress) for group in groups)
+                )
+                outcomes = [
+                    (page_data, result)
+                    for group, group_result in zip(groups, group_results)
+                    for page_data, result in zip(group, group_result)
+                ]
+        finally:
+            for p, previous in zip(providers, previous_dispatchers):
+                p.dispatcher = previous
+
+        failed_urls = []
+        for page_data, result in outcomes:
+            if isinstance(result, Exception):
+                print(f"  Error processing {page_data['url']}: {result}")
+                failed_urls.append(page_data['url'])
+            elif not result:
+                failed_urls.append(page_data['url'])
+
+        structured_data = await asyncio.to_thread(
+            self._finalize_output, output_file, scraped_data, converted
+        )
+        self._print_summary(structured_data, failed_urls)
+
+        return structured_data
+
+    def _submit_batch(self, scraped_data: List[Dict], prefix: str) -> str:
+        """Submit conversion prompts for all pages as one batch job."""
+        prompts = {
+            page_data['url_hash']: self._build_conversion_prompt(page_data, prefix=prefix)
+            for page_data in scraped_data
+        }
+        batch_id = self.provider.submit_batch(prompts, max_tokens=4000, system=prefix, json_output=True)
+        print(f"Submitted batch {batch_id} with {len(prompts)} requests")
+        return batch_id
+
+    def _collect_batch_results(
+        self,
+        batch_id: str,
+        scraped_data: List[Dict],
+        prefix: str,
+        poll_interval: float
+    ) -> Dict[str, Optional[Dict]]:
+        """Wait for a batch job and map its responses back to pages by url_hash."""
+        print(f"Waiting for batch {batch_id} to complete (checking every {poll_interval:.0f}s)...")
+        responses = self.provider.collect_batch(batch_id, poll_interval=poll_interval)
+
+        results = {}
+        for page_data in scraped_data:
+            response = responses.get(page_data['url_hash'])
+            structured = self._parse_conversion_response(response, page_data['url'])
+            if structured and not structured.get('_partial'):
+                prompt = self._build_conversion_prompt(page_data, prefix=prefix)
+                self._cache_set(self._cache_key(prefix, prompt), structured)
+            results[page_data['url_hash']] = structured
+
+        return results
+
+    def _convert_all_pages_batch(
+        self,
+        scraped_data: List[Dict],
+        schema: Dict,
+        output_file: str,
+        poll_interval: float
+    ) -> List[Dict]:
+        """
+        Convert all pages through the provider's batch API.
+
+        The batch ID is saved next to the output before polling starts, so a
+        run interrupted while waiting picks up the same batch instead of
+        submitting (and paying for) the pages again.
+        """
+        prefix = self._build_conversion_prefix(schema)
+        converted = self._load_progress(output_file)
+
+        # Pages converted in an earlier run don't need to go into the batch
+        pending = []
+        cached_count = 0
+        for page_data in scraped_data:
+            if page_data['url'] in converted:
+                continue
+            cached = self._cache_get(self._cache_key(prefix, self._build_conversion_prompt(page_data, prefix=prefix)))
+            if cached is not None:
+                converted[page_data['url']] = self._add_metadata(cached, page_data)
+                cached_count += 1
+            else:
+                pending.append(page_data)
+        if cached_count:
+            print(f"  {cached_count} pages found in conversion cache")
+
+        if pending:
+            state_file = self._batch_state_file(output_file)
             try:
-                structured = self.convert_page_to_structured_data(page_data, schema)
-
-                if structured:
-                    # Add metadata
-                    structured['_metadata'] = {
-                        'source_url': page_data['url'],
-                        'title': page_data['title'],
-                        'scraped_at': page_data['fetched_at'],
-                        'url_hash': page_data['url_hash']
-                    }
-                    structured_data.append(structured)
+                batch_id = self._load_batch_state(state_file, pending, prefix)
+                if batch_id:
+                    print(f"  Resuming batch {batch_id} from {state_file}")
                 else:
-                    failed_urls.append(page_data['url'])
-                    print(f"  Failed to convert page")
-
+                    batch_id = self._submit_batch(pending, prefix)
+                    json_utils.dump_file({
+                        'batch_id': batch_id,
+                        'key': self._cache_key(prefix, ""),
+                        'url_hashes': [page_data['url_hash'] for page_data in pending]
+                    }, state_file)
+                results = self._collect_batch_results(batch_id, pending, prefix, poll_interval)
             except Exception as e:
-                print(f"  Error processing page: {e}")
-                failed_urls.append(page_data['url'])
+                print(f"  Batch conversion failed: {e}")
+                if state_file.exists():
+                    print(f"  The next run resumes the batch recorded in {state_file}")
+            else:
+                with self._open_progress(output_file) as progress:
+                    for page_data in pending:
+                        structured = results.get(page_data['url_hash'])
+                        if structured:
+                            converted[page_data['url']] = self._add_metadata(structured, page_data)
+                            self._append_progress(progress, converted[page_data['url']])
+                state_file.unlink(missing_ok=True)
+
+        structured_data = self._finalize_output(output_file, scraped_data, converted)
+        failed_urls = [page_data['url'] for page_data in scraped_data if page_data['url'] not in converted]
+        self._print_summary(structured_data, failed_urls)
+
+        return structured_data
 
-            # Save progress periodically
-            if i % batch_size == 0:
-                self._save_output(output_file, structured_data)
-                print(f"  Progress saved ({len(structured_data)} pages converted)")
+    def _batch_state_file(self, output_file: str) -> Path:
+        """Path of the file recording a submitted batch until its results are in."""
+        return Path(str(output_file) + '.batch.json')
 
-            # Rate limiting
-            if i < len(scraped_data):
-                time.sleep(delay)
+    def _load_batch_state(self, state_file: Path, pending: List[Dict], prefix: str) -> Optional[str]:
+        """
+        Find a batch an earlier run submitted for these pages.
 
-        # Final save
-        self._save_output(output_file, structured_data)
+        Returns:
+            The batch ID, or None if there is none or it was submitted with a
+            different provider, model or schema, or doesn't cover every page
+        """
+        if not state_file.exists():
+            return None
+        try:
+            state = json_utils.load_file(state_file)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if state.get('key') != self._cache_key(prefix, ""):
+            return None
+        if not {page_data['url_hash'] for page_data in pending} <= set(state.get('url_hashes', [])):
+            return None
+        return state.get('batch_id')
 
+    def _print_summary(self, structured_data: List[Dict], failed_urls: List[str]):
+        """Print conversion results."""
         print(f"\nConversion complete!")
         print(f"Successfully converted: {len(structured_data)} pages")
         print(f"Failed: {len(failed_urls)} pages")
 
+        if self.tier_stats["fast"][1]:
+            for tier, (accepted, attempted) in self.tier_stats.items():
+                print(f"  {tier.capitalize()} model: {accepted}/{attempted} accepted")
+
         if failed_urls:
             print(f"\nFailed URLs:")
             for url in failed_urls[:10]:
@@ -403,12 +1797,76 @@ If certain fields cannot be extracted, use null or appropriate empty values.
             if len(failed_urls) > 10:
                 print(f"  ... and {len(failed_urls) - 10} more")
 
+    def _progress_file(self, output_file: str) -> Path:
+        """Path of the append-only JSONL file holding in-progress conversions."""
+        return Path(str(output_file) + '.jsonl')
+
+    def _load_progress(self, output_file: str) -> Dict[str, Dict]:
+        """
+        Read pages converted by an earlier, interrupted run.
+
+        Args:
+            output_file: Path of the final output JSON
+
+        Returns:
+            Dictionary mapping source URL to its structured data
+        """
+        progress_file = self._progress_file(output_file)
+        converted = {}
+        if not progress_file.exists():
+            return converted
+
+        with open(progress_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json_utils.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Last line may be cut short if the run was killed mid-write
+                    continue
+                source_url = record.get('_metadata', {}).get('source_url')
+                if source_url:
+                    converted[source_url] = record
+
+        if converted:
+            print(f"  Resuming: {len(converted)} pages already converted in {progress_file}")
+        return converted
+
+    def _open_progress(self, output_file: str):
+        """Open the progress file for appending, one JSON object per line."""
+        progress_file = self._progress_file(output_file)
+        progress_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Don't glue new records onto a truncated last line
+        needs_newline = False
+        if progress_file.exists() and progress_file.stat().st_size > 0:
+            with open(progress_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+
+        progress = open(progress_file, 'ab')
+        if needs_newline:
+            progress.write(b'\n')
+        return progress
+
+    def _append_progress(self, progress, structured: Dict):
+        """Append one converted page to the progress file."""
+        progress.write(json_utils.dumps_bytes(structured) + b'\n')
+        progress.flush()
+
+    def _finalize_output(self, output_file: str, scraped_data: List[Dict], converted: Dict[str, Dict]) -> List[Dict]:
+        """Write the final JSON array in scrape order and drop the progress file."""
+        structured_data = [converted[page_data['url']] for page_data in scraped_data
+                           if page_data['url'] in converted]
+        self._save_output(output_file, structured_data)
+        self._progress_file(output_file).unlink(missing_ok=True)
         return structured_data
 
     def _save_output(self, output_file: str, data: List[Dict]):
-        """Save structured data to file."""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        """Save structured data to file in the configured output format."""
+        if self.output_format == "ndjson":
+            json_utils.dump_lines(data, output_file)
+        else:
+            json_utils.dump_file(data, output_file)
 
 
 def main():
@@ -427,8 +1885,7 @@ def main():
     output_file = sys.argv[3] if len(sys.argv) > 3 else "structured_data.json"
 
     # Load scraped data
-    with open(input_file, 'r', encoding='utf-8') as f:
-        scraped_data = json.load(f)
+    scraped_data = json_utils.load_file(input_file)
 
     print(f"Loaded {len(scraped_data)} pages from {input_file}")
 
@@ -440,8 +1897,7 @@ def main():
 
     # Save analysis
     analysis_file = Path(output_file).parent / "schema_analysis.json"
-    with open(analysis_file, 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, indent=2, ensure_ascii=False)
+    json_utils.dump_file(analysis, analysis_file)
     print(f"Schema analysis saved to: {analysis_file}")
 
     # Convert all pages
@@ -10,13 +10,16 @@ Usage:
 """
 
 import asyncio
-import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
-from crawler import WebsiteCrawler
-from ai_converter import AIDataConverter
+from crawler import WebsiteCrawler, HTML_PARSER, extract_structure, extract_main_text, block_request, url_hash
+from ai_converter import AIDataConverter, AsyncRateLimiter
+import html_store
+import json_utils
 
 
 # Complete list of SSA Adult Listings URLs
@@ -38,7 +41,148 @@ ADULT_LISTING_URLS = [
 ]
 
 
-async def crawl_adult_listings(output_dir="./ssa_adult_listings"):
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Pages with less visible text than this are assumed to need JavaScript
+MIN_STATIC_TEXT_LENGTH = 200
+
+
+class BrowserFallback:
+    """Headless Chromium started on first use, for pages that need JavaScript."""
+
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._lock = asyncio.Lock()
+
+    async def fetch(self, url):
+        """Render a page and return (status, html)."""
+        async with self._lock:
+            if self._page is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True,
+                    args=['--disable-gpu', '--no-sandbox', '--disable-dev-shm-usage']
+                )
+                self._page = await self._browser.new_page()
+                await self._page.set_extra_http_headers({'User-Agent': USER_AGENT})
+                await self._page.route('**/*', block_request)
+
+            response = await self._page.goto(url, wait_until='domcontentloaded', timeout=60000)
+            if not response:
+                return None, ''
+            return response.status, await self._page.content()
+
+    async def close(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+
+async def _fetch_static(session, url):
+    """Fetch a page over plain HTTP and return (status, html)."""
+    async with session.get(url) as response:
+        return response.status, await response.text()
+
+
+def parse_ssa_html(content):
+    """
+    Extract title, text, headings and tables from a listing page.
+
+    Runs in a worker process, so it must stay a module-level function.
+
+    Args:
+        content: Raw HTML of the page
+
+    Returns:
+        Dictionary with title, text_content, headings and tables
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, HTML_PARSER)
+    structure = extract_structure(soup)
+
+    return {
+        'title': structure['title'],
+        'text_content': extract_main_text(soup),
+        'headings': structure['headings'],
+        'tables': structure['tables']
+    }
+
+
+async def _fetch_worker(queue, session, browser, executor, results, limiters, html_pages, total):
+    """Fetch queued URLs until cancelled, parsing each page in the process pool."""
+    from urllib.parse import urlparse
+    import time
+
+    loop = asyncio.get_running_loop()
+
+    while True:
+        i, url, url_hash = await queue.get()
+        try:
+            print(f"[{i}/{total}] Fetching: {url}")
+
+            # Polite per-host pacing
+            host = urlparse(url).netloc
+            limiter = limiters.setdefault(host, AsyncRateLimiter(1, 2.0))
+            rendered = session is None
+            if not rendered:
+                try:
+                    async with limiter:
+                        status, content = await _fetch_static(session, url)
+                except Exception as e:
+                    # Timeouts, resets and undecodable bodies get a second try in the browser
+                    print(f"  Static fetch failed: {e}")
+                    print(f"  Retrying with browser")
+                    rendered = True
+            if rendered:
+                async with limiter:
+                    status, content = await browser.fetch(url)
+
+            if not status or status >= 400:
+                print(f"  ⚠️  Failed: HTTP {status or 'No response'}")
+                continue
+
+            page_data = await loop.run_in_executor(executor, parse_ssa_html, content)
+
+            # SSA pages are server-rendered; only fall back to a browser for empty shells
+            if not rendered and len(page_data['text_content']) < MIN_STATIC_TEXT_LENGTH:
+                print(f"  Page looks JavaScript-rendered, retrying with browser")
+                async with limiter:
+                    status, content = await browser.fetch(url)
+                if not status or status >= 400:
+                    print(f"  ⚠️  Failed: HTTP {status or 'No response'}")
+                    continue
+                page_data = await loop.run_in_executor(executor, parse_ssa_html, content)
+
+            # HTML is compressed and written once every page is in
+            html_pages[url_hash] = content
+
+            results[i] = {
+                'url': url,
+                'url_hash': url_hash,
+                'title': page_data['title'],
+                'text_content': page_data['text_content'],
+                'headings': page_data['headings'],
+                'tables': page_data['tables'],
+                'links': [],  # Not extracting links for targeted crawl
+                'html_file': None,  # Filled in by crawl_adult_listings
+                'fetched_at': time.time()
+            }
+
+            print(f"  ✓ Success: {page_data['title'][:60]}...")
+            print(f"    Headings: {len(page_data['headings'])}, Tables: {len(page_data['tables'])}")
+
+        except Exception as e:
+            print(f"  ✗ Error: {e}")
+        finally:
+            queue.task_done()
+
+
+async def crawl_adult_listings(output_dir="./ssa_adult_listings", concurrency=4):
     """Crawl all adult listing pages."""
     print("="*70)
     print("SSA BLUE BOOK - ADULT LISTINGS TARGETED CRAWLER")
@@ -48,13 +192,13 @@ async def crawl_adult_listings(output_dir="./ssa_adult_listings"):
     print(f"Output directory: {output_dir}")
     print()
 
-    # Use the existing crawler but with specific URL list
-    # We'll crawl each page individually at depth 0 to get just those pages
-    from playwright.async_api import async_playwright
-    from bs4 import BeautifulSoup
-    from urllib.parse import urljoin
-    import hashlib
-    import time
+    # The listing pages are static HTML, so plain HTTP is enough; a browser is
+    # only started if a page turns out to need JavaScript
+    try:
+        import aiohttp
+    except ImportError:
+        aiohttp = None
+        print("aiohttp not installed, fetching pages with Playwright")
 
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -63,90 +207,58 @@ async def crawl_adult_listings(output_dir="./ssa_adult_listings"):
     json_dir = output_path / "json"
     json_dir.mkdir(exist_ok=True)
 
-    scraped_data = []
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-
-        await page.set_extra_http_headers({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-
-        for i, url in enumerate(ADULT_LISTING_URLS, 1):
-            print(f"[{i}/{len(ADULT_LISTING_URLS)}] Fetching: {url}")
+    queue = asyncio.Queue()
+    # Hash each URL once up front, with the same keys the main crawler uses
+    for i, url in enumerate(ADULT_LISTING_URLS, 1):
+        queue.put_nowait((i, url, url_hash(url)))
 
-            try:
-                response = await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+    results = {}
+    limiters = {}
+    html_pages = {}
+    browser = BrowserFallback()
+    executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    session = None
 
-                if not response or response.status >= 400:
-                    print(f"  ⚠️  Failed: HTTP {response.status if response else 'No response'}")
-                    continue
+    try:
+        if aiohttp:
+            session = aiohttp.ClientSession(
+                headers={'User-Agent': USER_AGENT},
+                connector=aiohttp.TCPConnector(limit=8),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+
+        workers = [
+            asyncio.create_task(
+                _fetch_worker(
+                    queue, session, browser, executor, results, limiters, html_pages,
+                    len(ADULT_LISTING_URLS)
+                )
+            )
+            for _ in range(min(concurrency, len(ADULT_LISTING_URLS)))
+        ]
+
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    finally:
+        if session:
+            await session.close()
+        await browser.close()
+        executor.shutdown()
 
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
-
-                # Extract data
-                text = soup.get_text(separator=' ', strip=True)
-                title = soup.find('title')
-                title_text = title.get_text(strip=True) if title else ''
-
-                # Extract headings
-                headings = []
-                for level in range(1, 7):
-                    for heading in soup.find_all(f'h{level}'):
-                        headings.append({
-                            'level': level,
-                            'text': heading.get_text(strip=True)
-                        })
-
-                # Extract tables
-                tables = []
-                for table in soup.find_all('table'):
-                    table_data = []
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cells = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
-                        if cells:
-                            table_data.append(cells)
-                    if table_data:
-                        tables.append(table_data)
-
-                # Save HTML
-                url_hash = hashlib.md5(url.encode()).hexdigest()
-                html_file = html_dir / f"{url_hash}.html"
-                with open(html_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-
-                page_data = {
-                    'url': url,
-                    'url_hash': url_hash,
-                    'title': title_text,
-                    'text_content': text,
-                    'headings': headings,
-                    'tables': tables,
-                    'links': [],  # Not extracting links for targeted crawl
-                    'html_file': str(html_file),
-                    'fetched_at': time.time()
-                }
-
-                scraped_data.append(page_data)
-                print(f"  ✓ Success: {title_text[:60]}...")
-                print(f"    Headings: {len(headings)}, Tables: {len(tables)}")
-
-                # Polite delay
-                await asyncio.sleep(2.0)
-
-            except Exception as e:
-                print(f"  ✗ Error: {e}")
-                continue
+    # Keep the original listing order regardless of completion order
+    scraped_data = [results[i] for i in sorted(results)]
 
-        await browser.close()
+    # Save HTML; the listing pages share a template, so a trained zstd dictionary
+    # shrinks them far more than compressing each page alone
+    html_files = await asyncio.to_thread(html_store.save_html_pages, html_dir, html_pages)
+    for page in scraped_data:
+        page['html_file'] = str(html_files[page['url_hash']])
 
     # Save data
     output_file = json_dir / "scraped_data.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(scraped_data, f, indent=2, ensure_ascii=False)
+    await asyncio.to_thread(json_utils.dump_file, scraped_data, output_file)
 
     print()
     print("="*70)
@@ -188,8 +300,7 @@ def convert_to_json(scraped_data, output_file, provider="gemini"):
     # Save schema
     output_path = Path(output_file).parent.parent
     schema_file = output_path / "json" / "schema_analysis.json"
-    with open(schema_file, 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, indent=2, ensure_ascii=False)
+    json_utils.dump_file(analysis, schema_file)
     print(f"  Schema saved: {schema_file}")
 
     # Convert data
@@ -222,11 +333,13 @@ async def main():
                        help="Only crawl, skip AI conversion")
     parser.add_argument("--output-dir", default="./ssa_adult_listings",
                        help="Output directory")
+    parser.add_argument("--concurrency", type=int, default=4,
+                       help="Number of pages fetched in parallel (default: 4)")
 
     args = parser.parse_args()
 
     # Crawl
-    scraped_data, data_file = await crawl_adult_listings(args.output_dir)
+    scraped_data, data_file = await crawl_adult_listings(args.output_dir, args.concurrency)
 
     if not scraped_data:
         print("\nNo data was scraped. Exiting.")
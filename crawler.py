@@ -4,16 +4,216 @@ Provides recursive crawling capabilities similar to wget -m or HTTrack
 """
 
 import os
+import re
+import html
+import math
 import asyncio
+import itertools
 import json
 import hashlib
+from functools import lru_cache
 from pathlib import Path
-from typing import Set, Dict, List, Optional
-from urllib.parse import urljoin, urlparse
+from collections import Counter
+from typing import Set, Dict, List, Optional, Union
+from urllib.parse import urljoin, urldefrag, urlparse, urlunparse, parse_qsl
 from playwright.async_api import async_playwright, Page, Browser
 from bs4 import BeautifulSoup
 import time
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+import html_store
+import json_utils
+
+# lxml is several times faster than the pure-Python parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+HEADING_LEVELS = {f'h{level}': level for level in range(1, 7)}
+
+# Elements whose text is never page content
+NOISE_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe', 'nav', 'footer', 'aside']
+
+# Common non-content URLs that are never crawled
+SKIP_EXTENSIONS = ['.pdf', '.jpg', '.png', '.gif', '.css', '.js', '.zip', '.exe']
+SKIP_EXTENSIONS_RE = re.compile('(?:' + '|'.join(map(re.escape, SKIP_EXTENSIONS)) + r')\Z', re.IGNORECASE)
+
+# Crawler-trap limits: URLs longer than this, or repeating one path segment
+# more than this many times (/a/b/a/b/a/b/...), are never crawled
+MAX_URL_LENGTH = 2048
+MAX_REPEATED_SEGMENTS = 3
+
+# Path segments that identify one record rather than a page type, and the
+# placeholder each collapses to in a URL fingerprint
+VARIABLE_SEGMENTS = [
+    (re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE), '{uuid}'),
+    (re.compile(r'^\d{4}-\d{2}-\d{2}$'), '{date}'),
+    (re.compile(r'^\d+$'), '{id}'),
+    (re.compile(r'^[0-9a-f]{16,}$', re.IGNORECASE), '{hex}'),
+    # Base64-like tokens: long, with a digit, and no hyphen- or underscore-joined
+    # words, so slugs such as how-to-apply-for-benefits-in-2024 stay distinct
+    (re.compile(r'^(?=.*\d)(?!.*(?<![A-Za-z])[A-Za-z][a-z]+[-_][A-Za-z][a-z]+(?![A-Za-z]))[A-Za-z0-9_-]{24,}={0,2}$'), '{token}'),
+]
+
+# Query parameters that never change page content
+NOISY_PARAMS = {'session', 'sessionid', 'sid', 'token', 'cb', '_', 'ref', 'fbclid', 'gclid'}
+NOISY_PARAM_PREFIXES = ('utm_',)
+
+# Query values more random than this (bits per character) are treated as IDs
+MAX_PARAM_ENTROPY = 3.5
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Pages fetched over plain HTTP with less visible text than this are assumed
+# to be JavaScript shells and are rendered in the browser instead
+MIN_STATIC_TEXT_LENGTH = 200
+
+# Title and <body> of the rendered page, fetched in one round trip
+BODY_SNAPSHOT_JS = "() => [document.title, document.body ? document.body.outerHTML : null]"
+
+# Subresources never used by the parser, so never worth downloading
+BLOCKED_RESOURCE_TYPES = {'image', 'stylesheet', 'font', 'media'}
+
+# Ad and analytics hosts; subdomains are blocked too
+TRACKER_HOSTS = {
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com',
+    'doubleclick.net', 'googleadservices.com', 'facebook.net',
+    'hotjar.com', 'segment.com', 'segment.io', 'mixpanel.com', 'amplitude.com',
+    'newrelic.com', 'nr-data.net', 'scorecardresearch.com', 'quantserve.com',
+    'taboola.com', 'outbrain.com', 'adnxs.com', 'criteo.com', 'clarity.ms',
+}
+
+# Progress log lines are flushed to disk every this many pages
+PROGRESS_FLUSH_EVERY = 25
+
+
+# The same link usually turns up on many pages; parse each URL once
+_parse_url = lru_cache(maxsize=16384)(urlparse)
+
+
+@lru_cache(maxsize=16384)
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL, used only as the key for deduplication.
+
+    Drops the fragment, lowercases scheme and host, sorts query parameters and
+    removes a trailing slash from the path, so https://Site.com/docs/#top and
+    https://site.com/docs are the same link. Pages are still fetched at the URL
+    as written, since the trailing slash changes how relative links resolve.
+    """
+    parsed = _parse_url(url)
+    path = parsed.path
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    query = '&'.join(sorted(parsed.query.split('&'))) if parsed.query else ''
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, parsed.params, query, ''))
+
+
+@lru_cache(maxsize=8192)
+def url_hash(url: str) -> str:
+    """
+    Hash a URL for use as a filename and page key.
+
+    Every crawler in the project keys pages with this, so the same URL always
+    maps to the same stored files.
+    """
+    # BLAKE2b is faster than MD5 and not flagged as a weak hash
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def extract_structure(soup: BeautifulSoup) -> Dict:
+    """
+    Collect title, headings, tables and link targets in one walk over the tree.
+
+    Args:
+        soup: Parsed page
+
+    Returns:
+        Dictionary with title, headings (document order), tables and raw hrefs
+    """
+    title_text = None
+    headings = []
+    tables = []
+    links = []
+
+    for tag in soup.find_all(True):
+        name = tag.name
+        if name == 'a':
+            href = tag.get('href')
+            if href:
+                links.append(href)
+        elif name in HEADING_LEVELS:
+            headings.append({
+                'level': HEADING_LEVELS[name],
+                'text': tag.get_text(strip=True)
+            })
+        elif name == 'table':
+            table_data = []
+            for row in tag.find_all('tr'):
+                cells = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+                if cells:
+                    table_data.append(cells)
+            if table_data:
+                tables.append(table_data)
+        elif name == 'title' and title_text is None:
+            title_text = tag.get_text(strip=True)
+
+    return {
+        'title': title_text or '',
+        'headings': headings,
+        'tables': tables,
+        'links': links
+    }
+
+
+def extract_main_text(soup: BeautifulSoup) -> str:
+    """
+    Get the visible text of the page's main content.
+
+    Uses <main> (or role="main", then <article>) when the page has one, and the
+    whole body otherwise. Scripts, styles, navigation and footers are dropped.
+    The soup is modified, so call this after extract_structure().
+
+    Args:
+        soup: Parsed page
+
+    Returns:
+        Space-separated text content
+    """
+    region = soup.find('main') or soup.find(attrs={'role': 'main'}) or soup.find('article')
+    if region is None or not region.get_text(strip=True):
+        region = soup.body or soup
+        noise = NOISE_TAGS + ['header']
+    else:
+        # A header inside the content region usually holds the page's own title
+        noise = NOISE_TAGS
+
+    for tag in region.find_all(noise):
+        tag.decompose()
+    return region.get_text(separator=' ', strip=True)
+
+
+def is_tracker_host(host: str) -> bool:
+    """Check a hostname and each of its parent domains against TRACKER_HOSTS."""
+    labels = host.lower().split('.')
+    return any('.'.join(labels[i:]) in TRACKER_HOSTS for i in range(len(labels) - 1))
+
+
+async def block_request(route):
+    """Playwright route handler that aborts assets and tracker requests."""
+    request = route.request
+    if (request.resource_type in BLOCKED_RESOURCE_TYPES
+            or is_tracker_host(urlparse(request.url).hostname or '')):
+        await route.abort()
+    else:
+        await route.continue_()
+
 
 class WebsiteCrawler:
     """
@@ -29,7 +229,11 @@ class WebsiteCrawler:
         delay: float = 1.0,
         max_pages: int = 100,
         include_patterns: Optional[List[str]] = None,
-        exclude_patterns: Optional[List[str]] = None
+        exclude_patterns: Optional[List[str]] = None,
+        concurrency: int = 4,
+        max_per_pattern: Optional[int] = None,
+        javascript: bool = True,
+        use_browser: Union[bool, str] = 'auto'
     ):
         """
         Initialize the crawler.
@@ -39,10 +243,18 @@ class WebsiteCrawler:
             output_dir: Directory to store scraped data
             max_depth: Maximum depth for recursive crawling
             same_domain_only: Only crawl URLs from the same domain
-            delay: Delay between requests in seconds
+            delay: Minimum delay between requests to the same host in seconds
             max_pages: Maximum number of pages to crawl
             include_patterns: List of URL patterns to include (substring match)
             exclude_patterns: List of URL patterns to exclude (substring match)
+            concurrency: Number of pages fetched in parallel (one browser tab each)
+            max_per_pattern: Maximum URLs crawled per fingerprint, i.e. per URL
+                that only differs in IDs, dates or tracking parameters; None for
+                no limit
+            javascript: Run page scripts; disable for server-rendered sites
+            use_browser: True to render every page in Chromium, False for plain
+                HTTP only, 'auto' to try HTTP first and render only pages that
+                look like JavaScript shells
         """
         self.base_url = base_url
         self.output_dir = Path(output_dir)
@@ -52,10 +264,38 @@ class WebsiteCrawler:
         self.max_pages = max_pages
         self.include_patterns = include_patterns or []
         self.exclude_patterns = exclude_patterns or []
+        self.concurrency = max(1, concurrency)
+        self.max_per_pattern = max(1, max_per_pattern) if max_per_pattern else None
+        self.javascript = javascript
+        if use_browser not in (True, False, 'auto'):
+            raise ValueError(f"use_browser must be True, False or 'auto', got {use_browser!r}")
+        if use_browser is not True and aiohttp is None:
+            if use_browser is False:
+                raise ImportError("aiohttp package not installed. Run: pip install aiohttp")
+            use_browser = True
+        self.use_browser = use_browser
+
+        # All substring patterns of each kind are matched in a single regex scan
+        self._exclude_re = self._compile_patterns(self.exclude_patterns)
+        self._include_re = self._compile_patterns(self.include_patterns)
 
         self.visited_urls: Set[str] = set()
+        self.visited_fingerprints: Counter = Counter()
+        self._rejected_urls: Set[str] = set()
         self.scraped_data: List[Dict] = []
-        self.base_domain = urlparse(base_url).netloc
+        self.base_domain = urlparse(base_url).netloc.lower()
+
+        # Per-host politeness: requests to one host start at least `delay` apart
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_last_fetch: Dict[str, float] = {}
+        self._queue_order = itertools.count()
+
+        # Started in crawl(); the browser only on first use in 'auto' mode
+        self._http_session = None
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._page_pool: Optional[asyncio.Queue] = None
+        self._browser_lock = asyncio.Lock()
 
         # Create output directory
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -63,163 +303,347 @@ class WebsiteCrawler:
         self.html_dir.mkdir(exist_ok=True)
         self.json_dir = self.output_dir / "json"
         self.json_dir.mkdir(exist_ok=True)
+        self.progress_file = self.json_dir / "crawl_progress.jsonl"
+        self._progress = None
+
+        # ETag / Last-Modified per URL from earlier crawls, for conditional GETs
+        self.http_cache_file = self.json_dir / "http_cache.json"
+        self._http_cache: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _compile_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+        """Compile substring patterns into one alternation (None if there are none)."""
+        if not patterns:
+            return None
+        return re.compile('|'.join(map(re.escape, patterns)))
+
+    @staticmethod
+    def _param_entropy(value: str) -> float:
+        """Shannon entropy of a string in bits per character."""
+        length = len(value)
+        return -sum(
+            count / length * math.log2(count / length)
+            for count in Counter(value).values()
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _url_fingerprint(url: str) -> str:
+        """
+        Reduce a URL to the shape of the page it points to.
+
+        IDs, UUIDs, dates and hashes in the path become placeholders, tracking
+        parameters are dropped and the rest of the query is sorted, so
+        /users/42/profile?utm_source=x and /users/97/profile share a fingerprint.
+        """
+        parsed = _parse_url(url)
+
+        segments = []
+        for segment in parsed.path.split('/'):
+            for pattern, placeholder in VARIABLE_SEGMENTS:
+                if pattern.match(segment):
+                    segment = placeholder
+                    break
+            segments.append(segment)
+
+        params = []
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True):
+            lowered = key.lower()
+            if lowered in NOISY_PARAMS or lowered.startswith(NOISY_PARAM_PREFIXES):
+                continue
+            if value.isdigit() or (value and WebsiteCrawler._param_entropy(value) > MAX_PARAM_ENTROPY):
+                value = '{v}'
+            params.append((key, value))
+
+        query = '&'.join(f"{key}={value}" for key, value in sorted(params))
+        return f"{parsed.netloc}{'/'.join(segments)}?{query}"
+
+    @staticmethod
+    def _is_trap(parsed) -> bool:
+        """Check for paths that keep repeating the same segments."""
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        if not segments:
+            return False
+        return Counter(segments).most_common(1)[0][1] > MAX_REPEATED_SEGMENTS
 
     def _should_crawl(self, url: str) -> bool:
         """Check if a URL should be crawled based on filters."""
-        # Check if already visited
-        if url in self.visited_urls:
+        # Check if already visited, under any spelling of the same URL
+        if normalize_url(url) in self.visited_urls:
             return False
 
         # Check max pages limit
         if len(self.visited_urls) >= self.max_pages:
             return False
 
-        parsed = urlparse(url)
+        # Navigation links turn up on every page; filter each URL only once
+        if url in self._rejected_urls:
+            return False
+        if not self._passes_filters(url):
+            self._rejected_urls.add(url)
+            return False
 
-        # Check domain restriction
-        if self.same_domain_only and parsed.netloc != self.base_domain:
+        # Skip near-duplicates once enough of one URL pattern has been queued
+        if (self.max_per_pattern
+                and self.visited_fingerprints[self._url_fingerprint(url)] >= self.max_per_pattern):
+            return False
+
+        return True
+
+    def _passes_filters(self, url: str) -> bool:
+        """Check the URL-only filters, whose verdict never changes during a crawl."""
+        # Cheap crawler-trap check before anything else
+        if len(url) > MAX_URL_LENGTH:
             return False
 
+        # String-only checks next, so most rejects never parse the URL
         # Check exclude patterns
-        for pattern in self.exclude_patterns:
-            if pattern in url:
-                return False
+        if self._exclude_re and self._exclude_re.search(url):
+            return False
 
         # Check include patterns (if specified, URL must match at least one)
-        if self.include_patterns:
-            if not any(pattern in url for pattern in self.include_patterns):
-                return False
+        if self._include_re and not self._include_re.search(url):
+            return False
 
         # Skip common non-content URLs
-        skip_extensions = ['.pdf', '.jpg', '.png', '.gif', '.css', '.js', '.zip', '.exe']
-        if any(url.lower().endswith(ext) for ext in skip_extensions):
+        if SKIP_EXTENSIONS_RE.search(url):
             return False
 
-        return True
+        parsed = _parse_url(url)
+
+        # Check domain restriction
+        if self.same_domain_only and parsed.netloc.lower() != self.base_domain:
+            return False
+
+        return not self._is_trap(parsed)
 
-    def _get_url_hash(self, url: str) -> str:
+    @staticmethod
+    def _get_url_hash(url: str) -> str:
         """Generate a hash for URL to use as filename."""
-        return hashlib.md5(url.encode()).hexdigest()
+        return url_hash(url)
+
+    async def _get_page_pool(self) -> asyncio.Queue:
+        """Start the browser on first use and return its pool of tabs."""
+        async with self._browser_lock:
+            if self._page_pool is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+
+                # One context shares cookies and the user agent across all tabs
+                context = await self._browser.new_context(
+                    user_agent=USER_AGENT,
+                    java_script_enabled=self.javascript
+                )
+                # Only the document is parsed, so skip images, CSS, fonts and trackers
+                await context.route('**/*', block_request)
+
+                # Tabs are opened once, concurrently, and reused for every navigation
+                page_pool: asyncio.Queue = asyncio.Queue()
+                pages = await asyncio.gather(*(context.new_page() for _ in range(self.concurrency)))
+                for page in pages:
+                    page_pool.put_nowait(page)
+                self._page_pool = page_pool
+        return self._page_pool
+
+    async def _close_browser(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._playwright = self._browser = self._page_pool = None
+
+    def _load_http_cache(self):
+        """Read validators saved by the previous crawl into this directory."""
+        if self.http_cache_file.exists():
+            try:
+                self._http_cache = json_utils.load_file(self.http_cache_file)
+            except (ValueError, OSError) as e:
+                print(f"Ignoring unreadable HTTP cache: {e}")
+                self._http_cache = {}
 
-    async def _fetch_page(self, page: Page, url: str) -> Optional[Dict]:
-        """Fetch and parse a single page."""
-        try:
-            print(f"Fetching: {url}")
+    async def _fetch_static(self, url: str) -> Optional[str]:
+        """
+        Fetch a page over plain HTTP; returns None on an error status.
+
+        Re-crawls send If-None-Match / If-Modified-Since, and on 304 Not Modified
+        the page is read back from the HTML stored by the earlier crawl.
+        """
+        cached = self._http_cache.get(url, {})
+        headers = {}
+        if cached.get('html_file') and Path(cached['html_file']).exists():
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        async with self._http_session.get(url, headers=headers) as response:
+            if response.status == 304 and headers:
+                print(f"  Not modified, using stored HTML")
+                return await asyncio.to_thread(html_store.load_html, cached['html_file'])
+            if response.status >= 400:
+                print(f"Failed to fetch {url}: HTTP {response.status}")
+                return None
 
-            # Navigate to the page
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+            if validators['etag'] or validators['last_modified']:
+                # html_file is filled in once the page is stored
+                self._http_cache[url] = validators
+            else:
+                self._http_cache.pop(url, None)
+            return await response.text()
+
+    async def _fetch_rendered(self, url: str) -> Optional[str]:
+        """Render a page in a pooled browser tab; returns None on an error status."""
+        page_pool = await self._get_page_pool()
+
+        # Hold a tab only while navigating, not while waiting on the host delay
+        page = await page_pool.get()
+        try:
             response = await page.goto(url, wait_until='domcontentloaded', timeout=60000)
 
             if not response or response.status >= 400:
                 print(f"Failed to fetch {url}: HTTP {response.status if response else 'No response'}")
                 return None
 
-            # Get page content
-            content = await page.content()
-
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(content, 'html.parser')
-
-            # Extract text content
-            text = soup.get_text(separator=' ', strip=True)
-
-            # Extract all links
-            raw_links = [a.get('href') for a in soup.find_all('a', href=True)]
-            absolute_links = [urljoin(url, link) for link in raw_links if link]
-
-            # Extract metadata
-            title = soup.find('title')
-            title_text = title.get_text(strip=True) if title else ''
-
-            # Get headings for structure
-            headings = []
-            for level in range(1, 7):
-                for heading in soup.find_all(f'h{level}'):
-                    headings.append({
-                        'level': level,
-                        'text': heading.get_text(strip=True)
-                    })
-
-            # Extract tables
-            tables = []
-            for table in soup.find_all('table'):
-                table_data = []
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
-                    if cells:
-                        table_data.append(cells)
-                if table_data:
-                    tables.append(table_data)
-
-            # Save HTML to file
-            url_hash = self._get_url_hash(url)
-            html_file = self.html_dir / f"{url_hash}.html"
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-
-            page_data = {
-                'url': url,
-                'url_hash': url_hash,
-                'title': title_text,
-                'text_content': text,
-                'headings': headings,
-                'tables': tables,
-                'links': absolute_links,
-                'html_file': str(html_file),
-                'fetched_at': time.time()
-            }
+            # Only the title is needed from <head>; skipping its inline scripts and
+            # styles roughly halves what is serialized, transferred and parsed
+            title, body = await page.evaluate(BODY_SNAPSHOT_JS)
+            if body is None:
+                return await page.content()
+            return f"<html><head><title>{html.escape(title)}</title></head>{body}</html>"
+        finally:
+            page_pool.put_nowait(page)
+
+    def _parse_page(self, url: str, content: str) -> Dict:
+        """Extract page data from HTML."""
+        # Parse with BeautifulSoup
+        soup = BeautifulSoup(content, HTML_PARSER)
+
+        # Title, headings, tables and links in a single pass (navigation included)
+        structure = extract_structure(soup)
+        # Menus repeat the same links; keep the first URL for each canonical
+        # form, in page order, without its fragment
+        links = {}
+        for link in structure['links']:
+            absolute = urldefrag(urljoin(url, link)).url
+            links.setdefault(normalize_url(absolute), absolute)
+        absolute_links = list(links.values())
+
+        # Text of the main content only, without scripts and boilerplate
+        text = extract_main_text(soup)
+
+        return {
+            'url': url,
+            'url_hash': self._get_url_hash(url),
+            'body_hash': None,
+            'title': structure['title'],
+            'text_content': text,
+            'headings': structure['headings'],
+            'tables': structure['tables'],
+            'links': absolute_links,
+            'html_file': None,
+            'fetched_at': time.time()
+        }
+
+    async def _store_html(self, page_data: Dict, content: str) -> Dict:
+        """Save compressed HTML, stored once per distinct body, and record where."""
+        # Compression and the write run in a thread so they don't stall other fetches
+        body_hash, html_file = await asyncio.to_thread(html_store.save_html_page, self.html_dir, content)
+        page_data['body_hash'] = body_hash
+        page_data['html_file'] = str(html_file)
+        if page_data['url'] in self._http_cache:
+            self._http_cache[page_data['url']]['html_file'] = str(html_file)
+        return page_data
+
+    async def _fetch_page(self, url: str) -> Optional[Dict]:
+        """Fetch and parse a single page."""
+        try:
+            print(f"Fetching: {url}")
 
-            return page_data
+            if self.use_browser is not True:
+                try:
+                    content = await self._fetch_static(url)
+                except Exception as e:
+                    if self.use_browser is False:
+                        raise
+                    print(f"  Static fetch failed: {e}")
+                    content = None
+                if content is not None:
+                    page_data = self._parse_page(url, content)
+                    if self.use_browser is False or len(page_data['text_content']) >= MIN_STATIC_TEXT_LENGTH:
+                        return await self._store_html(page_data, content)
+                if self.use_browser is False:
+                    return None
+                print(f"  Retrying with browser: {url}")
+                # The retry is a second request to the same host
+                await self._wait_for_host(url)
+
+            content = await self._fetch_rendered(url)
+            if content is None:
+                return None
+            return await self._store_html(self._parse_page(url, content), content)
 
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             return None
 
-    async def _crawl_recursive(
-        self,
-        page: Page,
-        url: str,
-        current_depth: int = 0
-    ):
-        """Recursively crawl pages starting from the given URL."""
-        # Check if we should crawl this URL
-        if not self._should_crawl(url):
-            return
-
-        # Check depth limit
-        if current_depth > self.max_depth:
+    def _enqueue(self, queue: asyncio.PriorityQueue, url: str, depth: int):
+        """Queue a URL unless it is filtered out or already seen."""
+        if depth > self.max_depth or not self._should_crawl(url):
             return
+        # Marked visited on enqueue so no other worker queues it again
+        self.visited_urls.add(normalize_url(url))
+        if self.max_per_pattern:
+            self.visited_fingerprints[self._url_fingerprint(url)] += 1
+        # Shallowest first, so concurrent workers still crawl breadth-first, then
+        # shorter paths (section pages before leaves); the counter keeps ties FIFO
+        path_depth = _parse_url(url).path.count('/')
+        queue.put_nowait((depth, path_depth, next(self._queue_order), url))
+
+    async def _wait_for_host(self, url: str):
+        """Wait until `delay` seconds have passed since the last request to url's host."""
+        host = _parse_url(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last_fetch.get(host, 0.0) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_last_fetch[host] = time.monotonic()
+
+    async def _worker(self, queue: asyncio.PriorityQueue):
+        """Fetch queued URLs until cancelled."""
+        while True:
+            depth, _, _, url = await queue.get()
+            try:
+                await self._wait_for_host(url)
+                page_data = await self._fetch_page(url)
 
-        # Mark as visited
-        self.visited_urls.add(url)
-
-        # Fetch the page
-        page_data = await self._fetch_page(page, url)
+                if not page_data:
+                    continue
 
-        if not page_data:
-            return
+                # Store the data
+                self.scraped_data.append(page_data)
 
-        # Store the data
-        self.scraped_data.append(page_data)
+                # Append to the progress log instead of rewriting a growing file
+                self._progress.write(json_utils.dumps_bytes(page_data) + b'\n')
+                if len(self.scraped_data) % PROGRESS_FLUSH_EVERY == 0:
+                    self._progress.flush()
 
-        # Save incremental progress
-        progress_file = self.json_dir / "crawl_progress.json"
-        with open(progress_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'total_pages': len(self.scraped_data),
-                'visited_urls': list(self.visited_urls),
-                'last_url': url
-            }, f, indent=2)
+                print(f"Crawled {len(self.scraped_data)}/{self.max_pages} pages (depth: {depth})")
 
-        print(f"Crawled {len(self.scraped_data)}/{self.max_pages} pages (depth: {current_depth})")
+                # Queue links for the next level instead of recursing
+                if depth < self.max_depth:
+                    for link in page_data['links']:
+                        self._enqueue(queue, link, depth + 1)
 
-        # Extract and follow links
-        if current_depth < self.max_depth:
-            for link in page_data['links']:
-                if self._should_crawl(link):
-                    # Add delay to be polite
-                    await asyncio.sleep(self.delay)
-                    await self._crawl_recursive(page, link, current_depth + 1)
+            except Exception as e:
+                print(f"Error crawling {url}: {e}")
+            finally:
+                queue.task_done()
 
     async def crawl(self) -> List[Dict]:
         """
@@ -231,26 +655,50 @@ class WebsiteCrawler:
         print(f"Starting crawl of {self.base_url}")
         print(f"Max depth: {self.max_depth}, Max pages: {self.max_pages}")
         print(f"Same domain only: {self.same_domain_only}")
+        print(f"Concurrency: {self.concurrency}")
+        print(f"JavaScript: {'enabled' if self.javascript else 'disabled'}")
+        print(f"Browser: {self.use_browser}")
         print(f"Output directory: {self.output_dir}")
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        if self.use_browser is not True:
+            self._load_http_cache()
 
-            # Set a realistic user agent
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
+            # One pooled HTTP client for every static fetch
+            self._http_session = aiohttp.ClientSession(
+                headers={'User-Agent': USER_AGENT},
+                connector=aiohttp.TCPConnector(limit=self.concurrency * 2),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
 
-            try:
-                await self._crawl_recursive(page, self.base_url, 0)
-            finally:
-                await browser.close()
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._enqueue(queue, self.base_url, 0)
+
+        # One line per crawled page, so a crash loses at most the unflushed tail
+        self._progress = open(self.progress_file, 'wb')
 
-        # Save final data
+        workers = []
+        try:
+            if self.use_browser is True:
+                await self._get_page_pool()
+
+            for _ in range(self.concurrency):
+                workers.append(asyncio.create_task(self._worker(queue)))
+
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._progress.close()
+            if self._http_session is not None:
+                await self._http_session.close()
+                self._http_session = None
+                await asyncio.to_thread(json_utils.dump_file, self._http_cache, self.http_cache_file, False)
+            await self._close_browser()
+
+        # Save final data; serializing a large crawl in a thread keeps the loop free
         output_file = self.json_dir / "scraped_data.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.scraped_data, f, indent=2, ensure_ascii=False)
+        await asyncio.to_thread(json_utils.dump_file, self.scraped_data, output_file)
 
         print(f"\nCrawling complete!")
         print(f"Total pages crawled: {len(self.scraped_data)}")
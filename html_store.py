@@ -0,0 +1,133 @@
+"""
+Compressed HTML Storage
+Saves raw HTML as zstd frames, either per page under the hash of the body or as
+a batch sharing a dictionary trained on the crawl itself.
+Falls back to plain .html files when zstandard is not installed.
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+
+# Dictionary size and compression level for the trained HTML dictionary
+DICT_SIZE = 16384
+COMPRESSION_LEVEL = 6
+
+# Pages written one at a time during a crawl favour speed over ratio
+PAGE_COMPRESSION_LEVEL = 3
+
+# Compressors are not safe to share between threads
+_local = threading.local()
+
+
+def _dictionary_path(html_dir: Path, dict_id: int) -> Path:
+    return html_dir / f"dictionary-{dict_id}.zstd"
+
+
+def content_hash(data: bytes) -> str:
+    """Hash a page body for content-addressed storage."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _page_compressor():
+    if not hasattr(_local, 'compressor'):
+        _local.compressor = zstd.ZstdCompressor(level=PAGE_COMPRESSION_LEVEL)
+    return _local.compressor
+
+
+def save_html_page(html_dir: Path, content: str) -> Tuple[str, Path]:
+    """
+    Write one page named after the hash of its body.
+
+    Pages with byte-identical HTML (mirrors, redirects, templated error pages)
+    are stored once; later copies just reuse the existing file.
+
+    Args:
+        html_dir: Directory to write into
+        content: Page HTML
+
+    Returns:
+        Tuple of (body_hash, path of the stored file)
+    """
+    html_dir = Path(html_dir)
+    data = content.encode('utf-8')
+    body_hash = content_hash(data)
+
+    if zstd is None:
+        path = html_dir / f"{body_hash}.html"
+        if not path.exists():
+            path.write_bytes(data)
+        return body_hash, path
+
+    path = html_dir / f"{body_hash}.html.zst"
+    if not path.exists():
+        path.write_bytes(_page_compressor().compress(data))
+    return body_hash, path
+
+
+def save_html_pages(html_dir: Path, pages: Dict[str, str]) -> Dict[str, Path]:
+    """
+    Write a batch of pages to html_dir.
+
+    Pages from one site share most of their markup, so a dictionary trained on
+    the batch compresses each page several times better than zstd alone. The
+    dictionary is saved next to the pages under its own ID, so files from
+    earlier runs stay readable.
+
+    Args:
+        html_dir: Directory to write into
+        pages: Mapping of url_hash -> HTML
+
+    Returns:
+        Mapping of url_hash -> path of the written file
+    """
+    html_dir = Path(html_dir)
+    html_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+
+    if zstd is None:
+        for url_hash, content in pages.items():
+            paths[url_hash] = html_dir / f"{url_hash}.html"
+            paths[url_hash].write_text(content, encoding='utf-8')
+        return paths
+
+    encoded = {url_hash: content.encode('utf-8') for url_hash, content in pages.items()}
+
+    try:
+        dictionary = zstd.train_dictionary(DICT_SIZE, list(encoded.values()))
+        _dictionary_path(html_dir, dictionary.dict_id()).write_bytes(dictionary.as_bytes())
+        compressor = zstd.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary)
+    except zstd.ZstdError:
+        # Too few or too small samples to train on
+        compressor = zstd.ZstdCompressor(level=COMPRESSION_LEVEL)
+
+    for url_hash, data in encoded.items():
+        paths[url_hash] = html_dir / f"{url_hash}.html.zst"
+        paths[url_hash].write_bytes(compressor.compress(data))
+    return paths
+
+
+def load_html(path) -> str:
+    """Read a page written by save_html_pages (.html or .html.zst)."""
+    path = Path(path)
+    if path.suffix != '.zst':
+        return path.read_text(encoding='utf-8')
+
+    if zstd is None:
+        raise ImportError("zstandard package not installed. Run: pip install zstandard")
+
+    data = path.read_bytes()
+    dict_id = zstd.get_frame_parameters(data).dict_id
+    if dict_id:
+        dictionary = zstd.ZstdCompressionDict(_dictionary_path(path.parent, dict_id).read_bytes())
+        decompressor = zstd.ZstdDecompressor(dict_data=dictionary)
+    else:
+        decompressor = zstd.ZstdDecompressor()
+    return decompressor.decompress(data).decode('utf-8')
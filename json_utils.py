@@ -0,0 +1,139 @@
+"""
+JSON Serialization Helpers
+Uses orjson when installed for faster encoding/decoding of large scraped
+payloads, falling back to the standard json module otherwise
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON, keeping non-ASCII characters as-is.
+
+    Args:
+        data: JSON-serializable object
+        indent: Pretty-print with 2-space indentation
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            # orjson rejects a few things json accepts (e.g. integers over 64 bits)
+            pass
+
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    # Same compact separators as orjson, so output doesn't depend on the backend
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps(data: Any, indent: bool = False) -> str:
+    """Serialize data to a JSON string (see dumps_bytes)."""
+    return dumps_bytes(data, indent=indent).decode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """
+    Parse a JSON string or bytes.
+
+    Raises json.JSONDecodeError on invalid input with either backend.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(data: Any, path, indent: bool = True):
+    """Write data to a UTF-8 JSON file (pretty-printed by default)."""
+    # Binary mode: the bytes are already UTF-8, so skip the text-layer encode
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(data, indent=indent))
+
+
+def dump_lines(items, path):
+    """Write each item as one compact JSON line (NDJSON)."""
+    with open(path, 'wb') as f:
+        for item in items:
+            f.write(dumps_bytes(item))
+            f.write(b'\n')
+
+
+def load_file(path) -> Any:
+    """Read a JSON file."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def loads_partial(text: str, max_attempts: int = 50) -> Any:
+    """
+    Parse JSON that was cut off part way through, e.g. by a token limit.
+
+    Closes any open string, arrays and objects, dropping a trailing member
+    that can't be completed (a dangling key or half-written literal).
+
+    Args:
+        text: Possibly truncated JSON text
+        max_attempts: How many cut points to try, starting from the end
+
+    Returns:
+        The recovered value
+
+    Raises:
+        json.JSONDecodeError: If nothing could be recovered
+    """
+    closers = {'{': '}', '[': ']'}
+    stack = []
+    in_string = False
+    escaped = False
+    # (end offset, closing brackets needed there) for each place a cut is safe
+    cut_points = []
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in closers:
+            stack.append(closers[char])
+            cut_points.append((i + 1, ''.join(reversed(stack))))
+        elif char in '}]':
+            if stack:
+                stack.pop()
+        elif char == ',':
+            cut_points.append((i, ''.join(reversed(stack))))
+
+    # First try keeping everything, closing an unfinished string value
+    tail = text.rstrip()
+    if in_string and not escaped:
+        tail += '"'
+    candidates = [tail.rstrip(',') + ''.join(reversed(stack))]
+    for end, closing in reversed(cut_points[-max_attempts:]):
+        candidates.append(text[:end] + closing)
+
+    error = None
+    for candidate in candidates:
+        try:
+            return loads(candidate)
+        except json.JSONDecodeError as e:
+            error = e
+    raise error or json.JSONDecodeError("No JSON value found", text, 0)
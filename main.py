@@ -2,11 +2,14 @@ import os
 import sys
 import json
 import asyncio
+import hashlib
+import shelve
 from pathlib import Path
 import google.generativeai as genai
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from playwright.async_api import async_playwright, Page
+from crawler import HTML_PARSER, extract_main_text
 
 def load_config():
     """
@@ -49,11 +52,20 @@ def load_config():
     print("Using default configuration.")
     return {"model_name": "gemini-pro"} # Default config
 
-def summarize_text(text, model_name):
+# Cap on the combined text sent in one batched summary request
+MAX_BATCH_CHARS = 120000
+
+# Summaries are cached by text, so revisiting a page costs no API call
+SUMMARY_CACHE_DIR = Path("./.ai_cache")
+
+_models = {}
+
+def get_model(model_name):
     """
-    Uses the Gemini API to summarize the given text into a bulleted list.
+    Returns a configured Gemini model, created once per model name so repeated
+    summaries reuse the same client.
     """
-    try:
+    if model_name not in _models:
         api_key = os.environ.get("GOOGLE_API_KEY")
         if not api_key:
             print("Error: GOOGLE_API_KEY environment variable not set.")
@@ -61,13 +73,97 @@ def summarize_text(text, model_name):
         genai.configure(api_key=api_key)
 
         print(f"Using generative model: {model_name}")
-        model = genai.GenerativeModel(model_name)
-        prompt = f"Summarize the following text from a website into a concise, bulleted list of the main points:\n\n{text}"
-        response = model.generate_content(prompt)
-        return response.text
+        _models[model_name] = genai.GenerativeModel(model_name)
+    return _models[model_name]
+
+def summary_cache_key(text, model_name):
+    """
+    Hashes the model name and page text into a summary cache key.
+    """
+    return hashlib.blake2b(f"{model_name}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+def request_summaries(texts, model_name):
+    """
+    Summarizes several documents with a single Gemini request.
+    Returns a list with one bulleted summary (or None) per input text.
+    """
+    try:
+        model = get_model(model_name)
+        if model is None:
+            return [None] * len(texts)
+
+        # Split the character budget evenly so every document gets a share
+        per_doc = MAX_BATCH_CHARS // len(texts)
+        sections = "\n\n".join(
+            f"===DOC {i}===\n{text[:per_doc]}" for i, text in enumerate(texts, 1)
+        )
+        prompt = (
+            "Summarize each document below from a website into a concise list of its main points. "
+            'Return JSON: {"summaries": [{"id": <document number>, "bullets": [<string>, ...]}]}\n\n'
+            f"{sections}"
+        )
+        response = model.generate_content(
+            prompt,
+            generation_config={'response_mime_type': 'application/json'}
+        )
+
+        summaries = [None] * len(texts)
+        for item in json.loads(response.text).get('summaries', []):
+            index = item.get('id')
+            if isinstance(index, int) and 1 <= index <= len(texts):
+                summaries[index - 1] = "\n".join(f"* {bullet}" for bullet in item.get('bullets', []))
+        return summaries
     except Exception as e:
         print(f"An error occurred during summarization: {e}")
-        return None
+        return [None] * len(texts)
+
+def summarize_texts(texts, model_name):
+    """
+    Summarizes several documents, sending only texts without a cached summary
+    to Gemini, all in one request.
+    Returns a list with one bulleted summary (or None) per input text.
+    """
+    if not texts:
+        return []
+
+    SUMMARY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with shelve.open(str(SUMMARY_CACHE_DIR / "summaries")) as cache:
+        keys = [summary_cache_key(text, model_name) for text in texts]
+        summaries = [cache.get(key) for key in keys]
+
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if len(missing) < len(texts):
+            print(f"Using {len(texts) - len(missing)} cached summaries")
+        if missing:
+            fresh = request_summaries([texts[i] for i in missing], model_name)
+            for i, summary in zip(missing, fresh):
+                summaries[i] = summary
+                if summary:
+                    cache[keys[i]] = summary
+
+    return summaries
+
+def summarize_text(text, model_name):
+    """
+    Uses the Gemini API to summarize the given text into a bulleted list.
+    """
+    return summarize_texts([text], model_name)[0]
+
+async def fetch_text_and_links(page: Page, url: str):
+    """
+    Loads a URL in the shared Playwright Page.
+    Returns the page text and its unique, absolute links.
+    """
+    await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+    content = await page.content()
+
+    soup = BeautifulSoup(content, HTML_PARSER)
+
+    # Links first: extracting the text drops navigation menus
+    raw_links = [a['href'] for a in soup.find_all('a', href=True)]
+    unique_links = list(dict.fromkeys([urljoin(url, link) for link in raw_links]))
+    text = extract_main_text(soup)
+    return text, unique_links
 
 async def fetch_parse_summarize(page: Page, url: str, model_name: str):
     """
@@ -76,11 +172,7 @@ async def fetch_parse_summarize(page: Page, url: str, model_name: str):
     """
     try:
         print(f"\nFetching content from {url}...")
-        await page.goto(url, wait_until='domcontentloaded', timeout=60000)
-        content = await page.content()
-
-        soup = BeautifulSoup(content, 'html.parser')
-        text = soup.get_text(separator=' ', strip=True)
+        text, unique_links = await fetch_text_and_links(page, url)
 
         if not text:
             print("Could not extract any text from the page.")
@@ -93,9 +185,6 @@ async def fetch_parse_summarize(page: Page, url: str, model_name: str):
             print(summary)
             print("------------------\n")
 
-        raw_links = [a['href'] for a in soup.find_all('a', href=True)]
-        unique_links = list(dict.fromkeys([urljoin(url, link) for link in raw_links]))
-        
         top_links = unique_links[:10]
 
         if top_links:
@@ -110,6 +199,31 @@ async def fetch_parse_summarize(page: Page, url: str, model_name: str):
         print(f"An unexpected error occurred: {e}")
         return []
 
+async def summarize_links(page: Page, links, model_name: str):
+    """
+    Fetches every link and summarizes them all with one batched request.
+    """
+    urls, texts = [], []
+    for link in links:
+        try:
+            print(f"Fetching content from {link}...")
+            text, _ = await fetch_text_and_links(page, link)
+            if text:
+                urls.append(link)
+                texts.append(text)
+        except Exception as e:
+            print(f"Could not fetch {link}: {e}")
+
+    if not texts:
+        print("Could not extract any text from the linked pages.")
+        return
+
+    print(f"Summarizing {len(texts)} pages in one request...")
+    for url, summary in zip(urls, summarize_texts(texts, model_name)):
+        print(f"\n--- AI Summary: {url} ---")
+        print(summary or "(no summary returned)")
+    print("------------------\n")
+
 async def main(model_name: str):
     """
     Main function to run the interactive scraping loop.
@@ -136,11 +250,17 @@ async def main(model_name: str):
             if not links_found:
                 print("\nNo links to follow from this page.")
             
-            prompt = "\nEnter a number to follow a link, 'new' to enter a new URL, or 'exit' to quit: "
+            prompt = "\nEnter a number to follow a link, 'all' to summarize every link, 'new' to enter a new URL, or 'exit' to quit: "
             user_choice = input(prompt).lower()
 
             if user_choice == 'exit':
                 break
+            elif user_choice == 'all':
+                origin = page.url
+                await summarize_links(page, links_found, model_name)
+                print("Returning to the previous page...")
+                await page.goto(origin, wait_until='domcontentloaded', timeout=60000)
+                current_url = origin
             elif user_choice == 'new':
                 current_url = input("Please enter the new URL: ")
                 if current_url:
@@ -154,7 +274,7 @@ async def main(model_name: str):
                         print("Invalid number. Please try again.")
                         current_url = page.url
                 except ValueError:
-                    print("Invalid input. Please enter a number, 'new', or 'exit'.")
+                    print("Invalid input. Please enter a number, 'all', 'new', or 'exit'.")
                     current_url = page.url
         
         await browser.close()
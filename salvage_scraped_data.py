@@ -73,6 +73,31 @@ Examples:
         help="Delay between AI API calls in seconds (default: 2.0)"
     )
 
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit all pages as one discounted batch job (claude/openai; may take up to 24h)"
+    )
+
+    parser.add_argument(
+        "--pages-per-call",
+        type=int,
+        default=1,
+        help="Pack up to N short pages into each AI request to share the schema prompt (default: 1)"
+    )
+
+    parser.add_argument(
+        "--fast-model",
+        type=str,
+        help="Cheaper model of the same provider to try first on small pages (e.g. gpt-4o-mini)"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached AI conversions and always call the provider"
+    )
+
     parser.add_argument(
         "--batch-size",
         type=int,
@@ -151,7 +176,11 @@ def salvage_data(args, scraped_data):
     # Initialize AI converter
     print(f"\nInitializing {args.provider} AI provider...")
     try:
-        converter = AIDataConverter(provider=args.provider)
+        converter = AIDataConverter(
+            provider=args.provider,
+            cache_dir=None if args.no_cache else "./.ai_cache",
+            fast_model=args.fast_model
+        )
     except Exception as e:
         print(f"ERROR: Failed to initialize AI provider: {e}")
         print("\nMake sure you have set the appropriate API key:")
@@ -204,7 +233,9 @@ def salvage_data(args, scraped_data):
         schema,
         str(output_file),
         batch_size=args.batch_size,
-        delay=args.conversion_delay
+        delay=args.conversion_delay,
+        use_batch=args.batch_api,
+        pages_per_call=args.pages_per_call
     )
 
     return output_file
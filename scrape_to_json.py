@@ -17,13 +17,16 @@ Example:
 
 import argparse
 import asyncio
+import copy
+import hashlib
 import json
 import sys
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
 
-from crawler import WebsiteCrawler
-from ai_converter import AIDataConverter
+import json_utils
 
 
 def parse_arguments():
@@ -83,7 +86,32 @@ Schema Reuse:
         "--delay",
         type=float,
         default=1.0,
-        help="Delay between requests in seconds (default: 1.0)"
+        help="Delay between requests to the same host in seconds (default: 1.0)"
+    )
+    crawl_group.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of pages to fetch in parallel (default: 4)"
+    )
+    crawl_group.add_argument(
+        "--max-per-pattern",
+        type=int,
+        default=None,
+        help="Maximum pages per URL pattern, e.g. /item/<id> (default: no limit)"
+    )
+    crawl_group.add_argument(
+        "--no-javascript",
+        dest="javascript",
+        action="store_false",
+        help="Disable page JavaScript (faster for server-rendered sites)"
+    )
+    crawl_group.add_argument(
+        "--browser",
+        choices=["auto", "always", "never"],
+        default="auto",
+        help="When to render pages in Chromium: auto tries plain HTTP first "
+             "and only renders pages that look JavaScript-built (default: auto)"
     )
     crawl_group.add_argument(
         "--same-domain",
@@ -123,6 +151,33 @@ Schema Reuse:
         default=2.0,
         help="Delay between AI API calls in seconds (default: 2.0)"
     )
+    ai_group.add_argument(
+        "--conversion-concurrency",
+        type=int,
+        default=5,
+        help="AI requests kept in flight at once; 1 converts pages one by one (default: 5)"
+    )
+    ai_group.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit all pages as one discounted batch job (claude/openai; may take up to 24h)"
+    )
+    ai_group.add_argument(
+        "--pages-per-call",
+        type=int,
+        default=1,
+        help="Pack up to N short pages into each AI request to share the schema prompt (default: 1)"
+    )
+    ai_group.add_argument(
+        "--fast-model",
+        type=str,
+        help="Cheaper model of the same provider to try first on small pages (e.g. gpt-4o-mini)"
+    )
+    ai_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached AI conversions and always call the provider"
+    )
     ai_group.add_argument(
         "--schema",
         type=str,
@@ -137,12 +192,30 @@ Schema Reuse:
         default=None,
         help="Output JSON file path (default: auto-generated)"
     )
+    output_group.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Output format: pretty-printed JSON array, or one compact object per line "
+             "(faster to write and stream) (default: json)"
+    )
+    output_group.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write the output as a zstd-compressed Parquet file for pandas/DuckDB (requires pyarrow)"
+    )
     output_group.add_argument(
         "--output-dir",
         default="./scraped_data",
         help="Directory for scraped data (default: ./scraped_data)"
     )
 
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print the full traceback when the run fails"
+    )
+
     return parser.parse_args()
 
 
@@ -157,6 +230,9 @@ async def crawl_website(args) -> tuple[Path, list]:
     print("STEP 1: CRAWLING WEBSITE")
     print("="*70)
 
+    # Imported here so --help and argument errors don't pay for Playwright and bs4
+    from crawler import WebsiteCrawler
+
     crawler = WebsiteCrawler(
         base_url=args.url,
         output_dir=args.output_dir,
@@ -165,7 +241,11 @@ async def crawl_website(args) -> tuple[Path, list]:
         delay=args.delay,
         max_pages=args.max_pages,
         include_patterns=args.include_patterns or [],
-        exclude_patterns=args.exclude_patterns or []
+        exclude_patterns=args.exclude_patterns or [],
+        concurrency=args.concurrency,
+        max_per_pattern=args.max_per_pattern,
+        javascript=args.javascript,
+        use_browser={'auto': 'auto', 'always': True, 'never': False}[args.browser]
     )
 
     scraped_data = await crawler.crawl()
@@ -173,40 +253,86 @@ async def crawl_website(args) -> tuple[Path, list]:
     return Path(args.output_dir), scraped_data
 
 
-def convert_to_json(args, output_dir: Path, scraped_data: list) -> Path:
+@lru_cache(maxsize=32)
+def _schema_slot(fingerprint: bytes) -> dict:
+    """Memo slot for one --schema file content hash; filled by load_schema_file."""
+    return {}
+
+
+def _classify_schema(raw: bytes) -> Tuple[str, dict]:
+    """Parse --schema file contents into (kind, analysis)."""
+    schema_data = json_utils.loads(raw)
+    # If the file contains a full analysis with 'schema' key, use it as is
+    if 'schema' in schema_data:
+        return "analysis", schema_data
+    # Otherwise, assume the file is the schema itself
+    return "schema", {
+        'content_type': 'Provided schema',
+        'entities': [],
+        'schema': schema_data,
+        'indexes': [],
+        'notes': 'Schema provided by user for consistent parsing'
+    }
+
+
+def load_schema_file(path) -> Tuple[str, dict]:
+    """
+    Load a --schema file as a schema analysis.
+
+    The file may hold a full analysis with a 'schema' key (as saved in
+    json/schema_analysis.json) or just the schema object. The last few files
+    are memoized by content hash, so loading an unchanged file again skips
+    parsing.
+
+    Args:
+        path: Schema file path
+
+    Returns:
+        Tuple of ('analysis' or 'schema', analysis dict)
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        json.JSONDecodeError: If the file isn't valid JSON
+    """
+    raw = Path(path).read_bytes()
+    # Only the 16-byte hash is kept as the cache key, not the file contents
+    slot = _schema_slot(hashlib.blake2b(raw, digest_size=16).digest())
+    if 'parsed' not in slot:
+        slot['parsed'] = _classify_schema(raw)
+    kind, analysis = slot['parsed']
+    # Callers may modify the analysis, so hand out a copy
+    return kind, copy.deepcopy(analysis)
+
+
+async def convert_to_json(args, output_dir: Path, scraped_data: list) -> Tuple[Path, dict]:
     """
     Convert scraped data to structured JSON using AI.
 
     Returns:
-        Path to the output JSON file
+        Tuple of (path to the output JSON file, schema analysis)
     """
     print("\n" + "="*70)
     print("STEP 2: CONVERTING TO STRUCTURED JSON")
     print("="*70)
 
-    # Initialize AI converter
-    converter = AIDataConverter(provider=args.provider)
+    # Initialize AI converter (imported here for the same reason as the crawler)
+    from ai_converter import AIDataConverter
+
+    converter = AIDataConverter(
+        provider=args.provider,
+        cache_dir=None if args.no_cache else "./.ai_cache",
+        fast_model=args.fast_model,
+        output_format=args.format
+    )
 
     # Check if a schema file was provided
     if args.schema:
         print(f"\nUsing provided schema from: {args.schema}")
         try:
-            with open(args.schema, 'r', encoding='utf-8') as f:
-                schema_data = json.load(f)
-
-            # If the file contains a full analysis with 'schema' key, extract it
-            if 'schema' in schema_data:
-                analysis = schema_data
+            kind, analysis = load_schema_file(args.schema)
+            if kind == "analysis":
                 print("Loaded schema from analysis file")
             else:
-                # Otherwise, assume the file is the schema itself
-                analysis = {
-                    'content_type': 'Provided schema',
-                    'entities': [],
-                    'schema': schema_data,
-                    'indexes': [],
-                    'notes': 'Schema provided by user for consistent parsing'
-                }
                 print("Loaded schema directly from file")
 
             print(f"  Content Type: {analysis.get('content_type', 'Unknown')}")
@@ -231,8 +357,7 @@ def convert_to_json(args, output_dir: Path, scraped_data: list) -> Path:
 
     # Save analysis
     analysis_file = output_dir / "json" / "schema_analysis.json"
-    with open(analysis_file, 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, indent=2, ensure_ascii=False)
+    json_utils.dump_file(analysis, analysis_file)
     print(f"  Schema saved to: {analysis_file}")
 
     # Determine output file
@@ -240,7 +365,7 @@ def convert_to_json(args, output_dir: Path, scraped_data: list) -> Path:
         output_file = Path(args.output)
     else:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = output_dir / f"structured_data_{timestamp}.json"
+        output_file = output_dir / f"structured_data_{timestamp}.{args.format}"
 
     # Convert all pages
     print(f"\nConverting {len(scraped_data)} pages to structured JSON...")
@@ -248,194 +373,174 @@ def convert_to_json(args, output_dir: Path, scraped_data: list) -> Path:
 
     if not schema:
         print("WARNING: No schema was generated. Saving raw data instead.")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(scraped_data, f, indent=2, ensure_ascii=False)
+        structured_data = scraped_data
+        if args.format == "ndjson":
+            json_utils.dump_lines(scraped_data, output_file)
+        else:
+            json_utils.dump_file(scraped_data, output_file)
+    elif args.conversion_concurrency > 1 and not args.batch_api:
+        # Requests overlap instead of waiting on each other; the delay becomes a rate cap
+        requests_per_minute = 60.0 / args.conversion_delay if args.conversion_delay > 0 else 6000.0
+        structured_data = await converter.aconvert_all_pages(
+            scraped_data,
+            schema,
+            str(output_file),
+            batch_size=5,
+            max_concurrent=args.conversion_concurrency,
+            requests_per_minute=requests_per_minute,
+            pages_per_call=args.pages_per_call
+        )
     else:
         structured_data = converter.convert_all_pages(
             scraped_data,
             schema,
             str(output_file),
             batch_size=5,
-            delay=args.conversion_delay
+            delay=args.conversion_delay,
+            use_batch=args.batch_api,
+            pages_per_call=args.pages_per_call
         )
 
-    return output_file
+    if args.parquet:
+        parquet_file = await asyncio.to_thread(write_parquet, structured_data, output_file)
+        if parquet_file:
+            print(f"Parquet copy saved to: {parquet_file}")
 
+    return output_file, analysis
 
-def generate_documentation(output_dir: Path, output_file: Path, args):
-    """Generate documentation for the exported data."""
-    print("\n" + "="*70)
-    print("STEP 3: GENERATING DOCUMENTATION")
-    print("="*70)
-
-    # Load the schema analysis
-    analysis_file = output_dir / "json" / "schema_analysis.json"
-    if not analysis_file.exists():
-        print("No schema analysis found, skipping documentation")
-        return
-
-    with open(analysis_file, 'r') as f:
-        analysis = json.load(f)
-
-    # Create README
-    readme_content = f"""# Structured Data Export
-
-Generated by AI-Powered Web Scraper
-Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-## Source Information
-
-- **Source URL**: {args.url}
-- **Pages Crawled**: {args.max_pages} (max)
-- **Crawl Depth**: {args.max_depth}
-- **AI Provider**: {args.provider}
-
-## Data Structure
-
-### Content Type
-{analysis.get('content_type', 'Unknown')}
-
-### Entities
-{chr(10).join(f"- {entity}" for entity in analysis.get('entities', []))}
-
-### JSON Schema
-
-```json
-{json.dumps(analysis.get('schema', {}), indent=2)}
-```
-
-## Database Integration
 
-### Recommended Indexes
-
-The following fields should be indexed for optimal search performance:
-
-{chr(10).join(f"- `{idx}`" for idx in analysis.get('indexes', []))}
-
-### Loading into Database
-
-#### MongoDB Example
-
-```javascript
-// Load the JSON file
-const fs = require('fs');
-const data = JSON.parse(fs.readFileSync('{output_file.name}', 'utf8'));
-
-// Insert into MongoDB
-const MongoClient = require('mongodb').MongoClient;
-const client = await MongoClient.connect('mongodb://localhost:27017');
-const db = client.db('mydb');
-const collection = db.collection('scraped_data');
-
-await collection.insertMany(data);
+def write_parquet(records: list, output_file: Path) -> Optional[Path]:
+    """
+    Write records to a zstd-compressed Parquet file next to output_file.
 
-// Create indexes
-{chr(10).join(f"await collection.createIndex({{ {idx}: 1 }});" for idx in analysis.get('indexes', []))}
-```
+    Columns are the union of keys over all records, with None where a record
+    lacks one. AI output doesn't always give a field one type across pages, so
+    a column Arrow can't type is stored as text: strings as they are, anything
+    else as JSON. Any failure only skips the Parquet copy.
 
-#### PostgreSQL Example (with JSONB)
+    Args:
+        records: Structured (or raw scraped) page dicts
+        output_file: JSON output path; the Parquet file gets the same name
 
-```sql
--- Create table
-CREATE TABLE scraped_data (
-    id SERIAL PRIMARY KEY,
-    data JSONB NOT NULL,
-    source_url TEXT,
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    Returns:
+        Path of the Parquet file, or None if it couldn't be written
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("WARNING: pyarrow not installed, skipping Parquet output. Run: pip install pyarrow")
+        return None
 
--- Load data (using COPY or INSERT)
--- Then create GIN index for JSONB
-CREATE INDEX idx_scraped_data_gin ON scraped_data USING GIN (data);
+    try:
+        columns = {}
+        for record in records:
+            for key in record:
+                columns.setdefault(key, None)
+
+        arrays = {}
+        for key in columns:
+            values = [record.get(key) for record in records]
+            try:
+                arrays[key] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays[key] = pa.array([
+                    value if value is None or isinstance(value, str) else json_utils.dumps(value)
+                    for value in values
+                ], type=pa.string())
+
+        parquet_file = output_file.with_suffix('.parquet')
+        pq.write_table(pa.table(arrays), parquet_file, compression='zstd')
+        return parquet_file
+    except Exception as e:
+        print(f"WARNING: Could not write Parquet output: {e}")
+        return None
 
--- Query examples
-SELECT * FROM scraped_data WHERE data->>'field_name' = 'value';
-SELECT * FROM scraped_data WHERE data @> '{{"key": "value"}}';
-```
 
-#### SQLite Example
+@lru_cache(maxsize=1)
+def _readme_template() -> str:
+    """Load the export README template (str.format_map placeholders)."""
+    return (Path(__file__).parent / "templates" / "readme.md.tmpl").read_text(encoding='utf-8')
 
-```python
-import sqlite3
-import json
 
-conn = sqlite3.connect('database.db')
-cursor = conn.cursor()
+def generate_documentation(output_dir: Path, output_file: Path, args, analysis: Optional[dict] = None):
+    """
+    Generate documentation for the exported data.
+
+    Args:
+        output_dir: Crawl output directory
+        output_file: Structured JSON file the README describes
+        args: Parsed command-line arguments
+        analysis: Schema analysis from convert_to_json; read from
+            json/schema_analysis.json when not given
+    """
+    print("\n" + "="*70)
+    print("STEP 3: GENERATING DOCUMENTATION")
+    print("="*70)
 
-# Create table
-cursor.execute('''
-    CREATE TABLE scraped_data (
-        id INTEGER PRIMARY KEY,
-        data TEXT,
-        source_url TEXT
-    )
-''')
-
-# Load and insert data
-with open('{output_file.name}', 'r') as f:
-    data = json.load(f)
-    for item in data:
-        cursor.execute(
-            'INSERT INTO scraped_data (data, source_url) VALUES (?, ?)',
-            (json.dumps(item), item.get('_metadata', {{}}).get('source_url'))
+    analysis_file = output_dir / "json" / "schema_analysis.json"
+    if analysis is None:
+        # Load the schema analysis
+        if not analysis_file.exists():
+            print("No schema analysis found, skipping documentation")
+            return
+        analysis = json_utils.load_file(analysis_file)
+
+    content_type = analysis.get('content_type', 'Unknown')
+    entities = analysis.get('entities', [])
+    schema = analysis.get('schema', {})
+    indexes = analysis.get('indexes', [])
+    notes = analysis.get('notes', 'No additional notes')
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # The loader snippets read the file the way it was written
+    if args.format == "ndjson":
+        output_description = "Structured data, one JSON object per line (read with `[json.loads(line) for line in f]`)"
+        py_load = "[json.loads(line) for line in f if line.strip()]"
+        js_load = (f"fs.readFileSync('{output_file.name}', 'utf8')"
+                   ".split('\\n').filter(Boolean).map(line => JSON.parse(line))")
+    else:
+        output_description = "Structured JSON data"
+        py_load = "json.load(f)"
+        js_load = f"JSON.parse(fs.readFileSync('{output_file.name}', 'utf8'))"
+
+    parquet_file = output_file.with_suffix('.parquet')
+    if args.parquet and parquet_file.exists():
+        parquet_example = (
+            "#### DuckDB Example (Parquet)\n\n"
+            "```python\n"
+            "import duckdb\n\n"
+            f"duckdb.sql(\"SELECT * FROM '{parquet_file.name}'\").show()\n"
+            "```\n\n"
         )
-
-conn.commit()
-
-# Enable FTS (Full Text Search)
-cursor.execute('CREATE VIRTUAL TABLE scraped_data_fts USING fts5(content)')
-```
-
-## Files Generated
-
-- `{output_file}` - Structured JSON data
-- `{analysis_file}` - Schema analysis and metadata
-- `{output_dir / 'html'}/*.html` - Raw HTML files
-- `{output_dir / 'json'}/scraped_data.json` - Raw scraped data
-- `{output_dir / 'json'}/crawl_progress.json` - Crawl progress info
-
-## Notes
-
-{analysis.get('notes', 'No additional notes')}
-
-## Search and Query Examples
-
-### Full-Text Search
-
-```python
-# Example: Search across all text content
-import json
-
-with open('{output_file.name}', 'r') as f:
-    data = json.load(f)
-
-def search(query):
-    results = []
-    for item in data:
-        # Search in relevant fields based on your schema
-        if query.lower() in str(item).lower():
-            results.append(item)
-    return results
-
-results = search("your search term")
-```
-
-### Filter by Metadata
-
-```python
-# Filter by source URL pattern
-filtered = [item for item in data
-           if 'pattern' in item.get('_metadata', {{}}).get('source_url', '')]
-```
-
----
-
-For more information about the web scraper tool, see the main README.md
-"""
+        parquet_file_entry = f"- `{parquet_file}` - Same data as Parquet (zstd), for pandas/DuckDB\n"
+    else:
+        parquet_example = parquet_file_entry = ""
 
     readme_file = output_dir / "README.md"
     with open(readme_file, 'w', encoding='utf-8') as f:
-        f.write(readme_content)
+        f.write(_readme_template().format_map({
+            'generated_at': generated_at,
+            'url': args.url,
+            'max_pages': args.max_pages,
+            'max_depth': args.max_depth,
+            'provider': args.provider,
+            'content_type': content_type,
+            'entities': "".join(f"- {entity}\n" for entity in entities),
+            'schema_json': json_utils.dumps(schema, indent=True),
+            'indexes': "".join(f"- `{idx}`\n" for idx in indexes),
+            'mongo_indexes': "".join(f"await collection.createIndex({{ {idx}: 1 }});\n" for idx in indexes),
+            'output_file': output_file,
+            'output_file_name': output_file.name,
+            'output_description': output_description,
+            'py_load': py_load,
+            'js_load': js_load,
+            'parquet_example': parquet_example,
+            'parquet_file_entry': parquet_file_entry,
+            'analysis_file': analysis_file,
+            'html_dir': output_dir / 'html',
+            'json_dir': output_dir / 'json',
+            'notes': notes,
+        }))
 
     print(f"\nDocumentation generated: {readme_file}")
 
@@ -465,11 +570,11 @@ async def main():
             output_file = output_dir / "json" / "scraped_data.json"
             print(f"\nRaw data saved to: {output_file}")
         else:
-            output_file = convert_to_json(args, output_dir, scraped_data)
+            output_file, analysis = await convert_to_json(args, output_dir, scraped_data)
             print(f"\nStructured data saved to: {output_file}")
 
             # Step 3: Generate documentation
-            generate_documentation(output_dir, output_file, args)
+            generate_documentation(output_dir, output_file, args, analysis)
 
         # Final summary
         print("\n" + "="*70)
@@ -485,8 +590,11 @@ async def main():
         sys.exit(1)
     except Exception as e:
         print(f"\n\nERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        if args.debug:
+            import traceback
+            traceback.print_exc()
+        else:
+            print("Run again with --debug for the full traceback")
         sys.exit(1)
 
 
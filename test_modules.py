@@ -5,7 +5,10 @@ Tests basic functionality without making actual API calls
 """
 
 import asyncio
+import io
 import json
+import sys
+import threading
 from pathlib import Path
 import tempfile
 import shutil
@@ -74,6 +77,16 @@ def test_url_filtering():
             assert crawler_obj._should_crawl("https://example.com/other")
             assert not crawler_obj._should_crawl("https://other.com/page")
 
+            # Hosts compare case-insensitively, starting with the base URL itself
+            crawler_obj = WebsiteCrawler(
+                base_url="https://www.Example.com/docs/",
+                output_dir=tmpdir,
+                same_domain_only=True
+            )
+
+            assert crawler_obj._should_crawl("https://www.Example.com/docs/")
+            assert crawler_obj._should_crawl("https://www.example.com/other")
+
             # Test include/exclude patterns
             crawler_obj = WebsiteCrawler(
                 base_url="https://example.com",
@@ -86,6 +99,14 @@ def test_url_filtering():
             assert not crawler_obj._should_crawl("https://example.com/blog/")
             assert not crawler_obj._should_crawl("https://example.com/docs/archive/old")
 
+            # Test crawler-trap filters
+            assert not crawler_obj._should_crawl("https://example.com/docs/a/b/a/b/a/b/a/b")
+            assert (crawler_obj._url_fingerprint("https://example.com/docs/42?utm_source=x") ==
+                    crawler_obj._url_fingerprint("https://example.com/docs/97"))
+            # Dated slugs are distinct pages, not record IDs
+            assert (crawler_obj._url_fingerprint("https://example.com/docs/how-to-apply-for-benefits-in-2024") !=
+                    crawler_obj._url_fingerprint("https://example.com/docs/how-to-appeal-a-decision-in-2024"))
+
         print("✓ URL filtering works correctly")
         return True
     except Exception as e:
@@ -245,6 +266,13 @@ def test_json_output():
                 loaded_data = json.load(f)
                 assert loaded_data == test_data
 
+            # Fast serializer helpers must produce the same file
+            import json_utils
+            fast_file = Path(tmpdir) / "test_output_fast.json"
+            json_utils.dump_file(test_data, fast_file)
+            assert json_utils.load_file(fast_file) == test_data
+            assert fast_file.read_text(encoding='utf-8') == output_file.read_text(encoding='utf-8')
+
         print("✓ JSON output works correctly")
         return True
     except Exception as e:
@@ -252,24 +280,113 @@ def test_json_output():
         return False
 
 
+def test_partial_json():
+    """Test recovery of JSON cut off by a token limit."""
+    print("\nTesting partial JSON recovery...")
+    try:
+        import json_utils
+
+        assert json_utils.loads_partial('{"a": 1, "b": "hel') == {"a": 1, "b": "hel"}
+        assert json_utils.loads_partial('{"a": 1, "b": {"c": [1, 2') == {"a": 1, "b": {"c": [1, 2]}}
+        assert json_utils.loads_partial('{"a": 1, "b":') == {"a": 1}
+        assert json_utils.loads_partial('{"a": [1, 2], "b": tr') == {"a": [1, 2]}
+
+        try:
+            json_utils.loads_partial('not json')
+            assert False, "Should have raised JSONDecodeError"
+        except json.JSONDecodeError:
+            pass
+
+        print("✓ Partial JSON recovery works correctly")
+        return True
+    except Exception as e:
+        print(f"✗ Partial JSON test failed: {e}")
+        return False
+
+
+class _ThreadOutput:
+    """stdout proxy that sends writes from registered threads to their own buffer."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def write(self, text):
+        return self.buffers.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        pass
+
+    def run(self, test_fn):
+        """Run a test in the current thread, returning (result, captured output)."""
+        buffer = io.StringIO()
+        self.buffers[threading.get_ident()] = buffer
+        try:
+            return test_fn(), buffer.getvalue()
+        finally:
+            del self.buffers[threading.get_ident()]
+
+    async def arun(self, test_fn):
+        """Run an async test, capturing what the event loop thread prints meanwhile."""
+        buffer = io.StringIO()
+        self.buffers[threading.get_ident()] = buffer
+        try:
+            return await test_fn(), buffer.getvalue()
+        finally:
+            del self.buffers[threading.get_ident()]
+
+
 async def run_all_tests():
-    """Run all tests."""
+    """Run all tests, writing the whole report to stdout at once when done."""
+    stdout = sys.stdout
+    output = _ThreadOutput(io.StringIO())
+    sys.stdout = output
+    try:
+        return await _run_tests(output)
+    finally:
+        sys.stdout = stdout
+        stdout.write(output.stream.getvalue())
+        stdout.flush()
+
+
+async def _run_tests(output: _ThreadOutput):
+    """Run the tests concurrently and print the report in declaration order."""
     print("="*70)
     print("WEB SCRAPER MODULE TESTS")
     print("="*70)
 
-    results = []
-
     # Basic tests (no async)
-    results.append(("Imports", test_imports()))
-    results.append(("Crawler Init", test_crawler_init()))
-    results.append(("URL Filtering", test_url_filtering()))
-    results.append(("AI Converter Init", test_ai_converter_init()))
-    results.append(("Data Structures", test_data_structures()))
-    results.append(("JSON Output", test_json_output()))
-
+    sync_tests = [
+        ("Imports", test_imports),
+        ("Crawler Init", test_crawler_init),
+        ("URL Filtering", test_url_filtering),
+        ("AI Converter Init", test_ai_converter_init),
+        ("Data Structures", test_data_structures),
+        ("JSON Output", test_json_output),
+        ("Partial JSON", test_partial_json),
+    ]
     # Async tests
-    results.append(("Basic Crawling", await test_crawler_basic()))
+    async_tests = [
+        ("Basic Crawling", test_crawler_basic),
+    ]
+
+    # The tests are independent, so run the sync ones in threads alongside the
+    # network-bound crawl; each test's output is buffered and replayed in order
+    outcomes = await asyncio.gather(
+        *(asyncio.to_thread(output.run, test_fn) for _, test_fn in sync_tests),
+        *(output.arun(test_fn) for _, test_fn in async_tests),
+        return_exceptions=True
+    )
+
+    results = []
+    for (test_name, _), outcome in zip(sync_tests + async_tests, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"\n✗ {test_name} raised: {outcome}")
+            results.append((test_name, False))
+        else:
+            result, captured = outcome
+            output.stream.write(captured)
+            results.append((test_name, result))
 
     # Summary
     print("\n" + "="*70)
@@ -279,9 +396,9 @@ async def run_all_tests():
     passed = sum(1 for _, result in results if result)
     total = len(results)
 
-    for test_name, result in results:
-        status = "✓ PASS" if result else "✗ FAIL"
-        print(f"{status:8} {test_name}")
+    output.stream.writelines(
+        f"{'✓ PASS' if result else '✗ FAIL':8} {test_name}\n" for test_name, result in results
+    )
 
     print(f"\nTotal: {passed}/{total} tests passed")
 
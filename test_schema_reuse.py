@@ -3,14 +3,125 @@
 Test script for schema reuse functionality
 """
 
+import atexit
+import contextlib
+import io
 import json
+import os
+import shutil
+import sys
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import json_utils
+from scrape_to_json import load_schema_file
+
+# Scratch directory shared by the tests, on tmpfs where available; files are
+# overwritten in place rather than recreating a directory per test
+_TMPDIR = Path(tempfile.mkdtemp(prefix="schema_test_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None))
+atexit.register(shutil.rmtree, _TMPDIR, ignore_errors=True)
+
+# Checked-in example schema that create_example_schema copies into place
+_EXAMPLE_SCHEMA_FILE = Path(__file__).with_name("example_schema.json")
+
+# Serializes test reports when main runs the tests in parallel
+_REPORT_LOCK = threading.Lock()
+
+# Static text printed by print_usage_examples and main, written in one call each
+_BAR = "=" * 70 + "\n"
+_HEADER_TEXT = _BAR + "SCHEMA REUSE FUNCTIONALITY TESTS\n" + _BAR + "\n"
+
+_USAGE_TEXT = """\
+======================================================================
+SCHEMA REUSE - USAGE EXAMPLES
+======================================================================
+
+1. BASIC USAGE:
+----------------------------------------------------------------------
+# First crawl - generate schema
+python scrape_to_json.py https://example.com --output v1.json
+
+# Later crawl - reuse schema
+python scrape_to_json.py https://example.com \\
+    --schema ./scraped_data/json/schema_analysis.json \\
+    --output v2.json
+
+2. MULTIPLE SIMILAR SITES:
+----------------------------------------------------------------------
+# Crawl first state's site
+python scrape_to_json.py https://state1.example.gov \\
+    --output state1.json
+
+# Use same schema for other states
+python scrape_to_json.py https://state2.example.gov \\
+    --schema ./scraped_data/json/schema_analysis.json \\
+    --output state2.json
+
+3. REGULAR UPDATES:
+----------------------------------------------------------------------
+# Monthly update - keep schema consistent
+python scrape_to_json.py https://docs.example.com \\
+    --schema ./my_schema.json \\
+    --output docs_$(date +%Y%m).json
+
+4. CUSTOM SCHEMA:
+----------------------------------------------------------------------
+# Create your own schema file (JSON format)
+# Then use it:
+python scrape_to_json.py https://example.com \\
+    --schema ./my_custom_schema.json
+
+======================================================================
+
+"""
+
+_BENEFITS_TEXT = """\
+BENEFITS OF SCHEMA REUSE:
+======================================================================
+✅ Consistent field names across all crawls
+✅ Same data types for all fields
+✅ Easier to merge datasets from different times
+✅ Faster processing (skips AI analysis)
+✅ Reduced API costs
+✅ Predictable database schema
+✅ Works across similar sites
+
+WHEN TO USE SCHEMA REUSE:
+======================================================================
+• Regular website monitoring/updates
+• Multiple similar sites (state agencies, mirrors)
+• Tracking content changes over time
+• Maintaining consistent database structure
+• Processing related websites with same structure
+
+"""
+
+
+def _report(title: str, checks: list, passed: str = ""):
+    """
+    Write a test's checks as one block of output.
+
+    Args:
+        title: Heading line for the test
+        checks: (description, ok) pairs in the order they ran
+        passed: Closing line, given only when the test passed
+    """
+    if os.environ.get("QUIET"):
+        return
+    lines = [title] + [f"  {'✓' if ok else '✗'} {name}" for name, ok in checks]
+    if passed:
+        lines.append(passed + "\n")
+    # Tests may run in parallel; keep each report in one piece
+    with _REPORT_LOCK:
+        sys.stdout.write("\n".join(lines) + "\n")
+
 
 def test_schema_format():
     """Test that schema files in different formats are handled correctly."""
-    print("Testing schema format handling...")
+    checks = []
+    passed = ""
 
     # Test 1: Full analysis format (recommended)
     full_analysis = {
@@ -26,43 +137,35 @@ def test_schema_format():
     }
 
     # Test 2: Just schema object
-    schema_only = {
-        "title": "string",
-        "content": "string",
-        "section": "string"
-    }
+    schema_only = full_analysis["schema"]
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Write full analysis format
-        full_analysis_file = Path(tmpdir) / "full_analysis.json"
-        with open(full_analysis_file, 'w') as f:
-            json.dump(full_analysis, f, indent=2)
+    try:
+        # Write both formats the way --schema files arrive, then load them
+        # through the same function scrape_to_json uses
+        full_analysis_file = _TMPDIR / "full_analysis.json"
+        schema_only_file = _TMPDIR / "schema_only.json"
+        json_utils.dump_file(full_analysis, full_analysis_file)
+        json_utils.dump_file(schema_only, schema_only_file)
+        checks.append((f"Full analysis format saved to: {full_analysis_file}", True))
+        checks.append((f"Schema-only format saved to: {schema_only_file}", True))
 
-        # Write schema-only format
-        schema_only_file = Path(tmpdir) / "schema_only.json"
-        with open(schema_only_file, 'w') as f:
-            json.dump(schema_only, f, indent=2)
+        kind, loaded_full = load_schema_file(full_analysis_file)
+        assert kind == "analysis" and loaded_full == full_analysis
+        checks.append(("Full analysis format loaded as an analysis", True))
 
-        print(f"  ✓ Full analysis format saved to: {full_analysis_file}")
-        print(f"  ✓ Schema-only format saved to: {schema_only_file}")
+        kind, loaded_schema = load_schema_file(schema_only_file)
+        assert kind == "schema" and loaded_schema['schema'] == schema_only
+        checks.append(("Schema-only format loaded and wrapped in an analysis", True))
 
-        # Verify files can be loaded
-        with open(full_analysis_file, 'r') as f:
-            loaded_full = json.load(f)
-            assert 'schema' in loaded_full
-            print(f"  ✓ Full analysis format loaded successfully")
-
-        with open(schema_only_file, 'r') as f:
-            loaded_schema = json.load(f)
-            assert 'title' in loaded_schema
-            print(f"  ✓ Schema-only format loaded successfully")
-
-    print("✅ Schema format handling test passed\n")
+        passed = "✅ Schema format handling test passed"
+    finally:
+        _report("Testing schema format handling...", checks, passed)
 
 
 def test_schema_validation():
     """Test schema validation logic."""
-    print("Testing schema validation...")
+    checks = []
+    passed = ""
 
     # Valid schema
     valid_schema = {
@@ -71,64 +174,57 @@ def test_schema_validation():
         "content": "string"
     }
 
-    # Invalid JSON (will be caught by json.load)
+    # Invalid JSON (raises the error scrape_to_json catches)
     invalid_json = "{ this is not valid json }"
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Write valid schema
-        valid_file = Path(tmpdir) / "valid_schema.json"
-        with open(valid_file, 'w') as f:
-            json.dump(valid_schema, f)
-
-        # Write invalid JSON
-        invalid_file = Path(tmpdir) / "invalid_schema.json"
-        with open(invalid_file, 'w') as f:
-            f.write(invalid_json)
+    try:
+        # Write valid schema; loaded from disk the way --schema files are
+        valid_file = _TMPDIR / "valid_schema.json"
+        json_utils.dump_file(valid_schema, valid_file, indent=False)
 
         # Test valid schema loads
         try:
-            with open(valid_file, 'r') as f:
-                schema = json.load(f)
-                print("  ✓ Valid schema loaded successfully")
+            kind, analysis = load_schema_file(valid_file)
+            assert kind == "schema" and analysis['schema'] == valid_schema
+            checks.append(("Valid schema loaded successfully", True))
         except json.JSONDecodeError:
-            print("  ✗ Valid schema failed to load")
+            checks.append(("Valid schema failed to load", False))
             return False
 
         # Test invalid JSON is caught
+        invalid_file = _TMPDIR / "invalid_schema.json"
+        invalid_file.write_text(invalid_json)
         try:
-            with open(invalid_file, 'r') as f:
-                schema = json.load(f)
-                print("  ✗ Invalid JSON should have raised error")
-                return False
+            load_schema_file(invalid_file)
+            checks.append(("Invalid JSON should have raised error", False))
+            return False
         except json.JSONDecodeError:
-            print("  ✓ Invalid JSON correctly caught")
+            checks.append(("Invalid JSON correctly caught", True))
 
-    print("✅ Schema validation test passed\n")
+        # Test a missing file is reported as such
+        try:
+            load_schema_file(_TMPDIR / "missing_schema.json")
+            checks.append(("Missing file should have raised error", False))
+            return False
+        except FileNotFoundError:
+            checks.append(("Missing file correctly caught", True))
+
+        passed = "✅ Schema validation test passed"
+    finally:
+        _report("Testing schema validation...", checks, passed)
 
 
 def create_example_schema():
     """Create an example schema file for testing."""
     print("Creating example schema file...")
 
-    example_schema = {
-        "content_type": "Medical Documentation",
-        "entities": ["condition", "criteria", "body_system"],
-        "schema": {
-            "condition_name": "string",
-            "condition_code": "string",
-            "body_system": "string",
-            "criteria": "array of objects",
-            "severity_levels": "array of strings",
-            "diagnostic_requirements": "text",
-            "notes": "text"
-        },
-        "indexes": ["condition_code", "body_system", "condition_name"],
-        "notes": "Schema for medical disability criteria (e.g., SSA Blue Book)"
-    }
-
     output_file = Path("example_schema.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(example_schema, f, indent=2, ensure_ascii=False)
+    if not (output_file.exists() and output_file.samefile(_EXAMPLE_SCHEMA_FILE)):
+        # Copy beside the target and rename, so a reader never sees half a
+        # file; copyfile uses a kernel-side copy where the OS has one
+        tmp_file = output_file.with_suffix('.json.tmp')
+        shutil.copyfile(_EXAMPLE_SCHEMA_FILE, tmp_file)
+        os.replace(tmp_file, output_file)
 
     print(f"  ✓ Example schema saved to: {output_file}")
     print("\n  You can use this schema with:")
@@ -140,94 +236,46 @@ def create_example_schema():
 
 def print_usage_examples():
     """Print usage examples for schema reuse."""
-    print("="*70)
-    print("SCHEMA REUSE - USAGE EXAMPLES")
-    print("="*70)
-    print()
-
-    print("1. BASIC USAGE:")
-    print("-" * 70)
-    print("# First crawl - generate schema")
-    print("python scrape_to_json.py https://example.com --output v1.json")
-    print()
-    print("# Later crawl - reuse schema")
-    print("python scrape_to_json.py https://example.com \\")
-    print("    --schema ./scraped_data/json/schema_analysis.json \\")
-    print("    --output v2.json")
-    print()
-
-    print("2. MULTIPLE SIMILAR SITES:")
-    print("-" * 70)
-    print("# Crawl first state's site")
-    print("python scrape_to_json.py https://state1.example.gov \\")
-    print("    --output state1.json")
-    print()
-    print("# Use same schema for other states")
-    print("python scrape_to_json.py https://state2.example.gov \\")
-    print("    --schema ./scraped_data/json/schema_analysis.json \\")
-    print("    --output state2.json")
-    print()
-
-    print("3. REGULAR UPDATES:")
-    print("-" * 70)
-    print("# Monthly update - keep schema consistent")
-    print("python scrape_to_json.py https://docs.example.com \\")
-    print("    --schema ./my_schema.json \\")
-    print("    --output docs_$(date +%Y%m).json")
-    print()
-
-    print("4. CUSTOM SCHEMA:")
-    print("-" * 70)
-    print("# Create your own schema file (JSON format)")
-    print("# Then use it:")
-    print("python scrape_to_json.py https://example.com \\")
-    print("    --schema ./my_custom_schema.json")
-    print()
-
-    print("="*70)
-    print()
+    sys.stdout.write(_USAGE_TEXT)
 
 
 def main():
-    """Run all tests."""
-    print("="*70)
-    print("SCHEMA REUSE FUNCTIONALITY TESTS")
-    print("="*70)
-    print()
-
-    # Run tests
-    test_schema_format()
-    test_schema_validation()
-    example_file = create_example_schema()
-
-    # Print usage examples
-    print_usage_examples()
-
-    print("BENEFITS OF SCHEMA REUSE:")
-    print("="*70)
-    print("✅ Consistent field names across all crawls")
-    print("✅ Same data types for all fields")
-    print("✅ Easier to merge datasets from different times")
-    print("✅ Faster processing (skips AI analysis)")
-    print("✅ Reduced API costs")
-    print("✅ Predictable database schema")
-    print("✅ Works across similar sites")
-    print()
-
-    print("WHEN TO USE SCHEMA REUSE:")
-    print("="*70)
-    print("• Regular website monitoring/updates")
-    print("• Multiple similar sites (state agencies, mirrors)")
-    print("• Tracking content changes over time")
-    print("• Maintaining consistent database structure")
-    print("• Processing related websites with same structure")
-    print()
-
-    print("✅ All tests passed!")
-    print()
-    print(f"Example schema created: {example_file}")
-    print("See examples/schema_reuse_example.sh for complete demonstration")
+    """
+    Run all tests.
+
+    With -q/--quiet nothing is printed and the usage examples are skipped;
+    only the exit status reports the result.
+
+    Returns:
+        Exit status (0 if all tests passed)
+    """
+    quiet = '-q' in sys.argv[1:] or '--quiet' in sys.argv[1:]
+    with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+        sys.stdout.write(_HEADER_TEXT)
+
+        # Run tests; they share no state, so run them side by side
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda test: test(), [test_schema_format, test_schema_validation]))
+        if False in results:
+            print("✗ Schema reuse tests failed")
+            return 1
+        example_file = create_example_schema()
+        if quiet:
+            return 0
+
+        # Print usage examples
+        print_usage_examples()
+
+        sys.stdout.write(_BENEFITS_TEXT)
+
+        sys.stdout.write(
+            "✅ All tests passed!\n\n"
+            f"Example schema created: {example_file}\n"
+            "See examples/schema_reuse_example.sh for complete demonstration\n"
+        )
+        sys.stdout.flush()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())